@@ -0,0 +1,238 @@
+# API local de controle em JSON sobre HTTP/1.1, servida por asyncio no mesmo event
+# loop do runtime (na interface, o loop processado pelo Tk), então nunca bloqueia a
+# interface. Conexões keep-alive são reaproveitadas entre requisições.
+#
+#   GET  /state              estado completo da casa
+#   GET  /subscribe          fluxo de mudanças (NDJSON, chunked) até o cliente desconectar; um
+#                            cliente lento demais recebe o que estava na fila, um aviso
+#                            {"error": ..., "lost": true} e o fim do fluxo
+#   POST /commands           lote de comandos: {"commands": [{"room": "kitchen", "device": "light", "on": true}, ...]}
+#   POST /mode               {"mode": "Manual"} ou {"mode": "Automático"}
+#   POST /reset              redefine os atuadores (somente no modo Manual)
+#   GET  /energy?period=day  consumo por cômodo na janela (hour, day, week ou month)
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from home_core import MANUAL, AUTOMATIC
+from energy import PERIODS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Eventos pendentes por assinante antes de ele ser desconectado por lentidão
+SUBSCRIBER_QUEUE = 1024
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ControlAPI:
+    __slots__ = ("home", "energy", "host", "port", "server", "_subscribers", "_overflowed", "requests")
+
+    def __init__(self, home, host=DEFAULT_HOST, port=DEFAULT_PORT, energy=None):
+        self.home = home
+        # EnergyMeter opcional que atende /energy
+        self.energy = energy
+        self.host = host
+        self.port = port
+        self.server = None
+        self._subscribers = set()
+        # Filas de assinantes desconectados por lentidão (perderam eventos)
+        self._overflowed = set()
+        self.requests = 0
+        home.add_listener(self.on_change)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        # Porta 0 escolhe uma porta livre
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        self.home.remove_listener(self.on_change)
+        for queue in list(self._subscribers):
+            self._subscribers.discard(queue)
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+        if self.server is not None:
+            self.server.close()
+
+    # Listener do núcleo: repassa a mudança para cada assinante de /subscribe
+    def on_change(self, room_key, field, value):
+        if not self._subscribers:
+            return
+        event = {"room": room_key, "field": field, "value": value}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Cliente lento demais: para de receber mudanças; o fluxo escreve o que
+                # já estava na fila, avisa que houve perda e termina
+                self._subscribers.discard(queue)
+                self._overflowed.add(queue)
+
+    # --- Protocolo ------------------------------------------------------
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "corpo grande demais"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() == "HTTP/1.1")
+                self.requests += 1
+
+                if method == "GET" and path == "/subscribe":
+                    await self._stream(writer)
+                    break
+                try:
+                    status, payload = self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _stream(self, writer):
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self._subscribers.add(queue)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        try:
+            # Primeiro o estado completo, depois as mudanças
+            self._write_chunk(writer, {"state": self.home.to_dict()})
+            await writer.drain()
+            # Depois de sair dos assinantes (lentidão ou stop), só esvazia a fila
+            while queue in self._subscribers or not queue.empty():
+                event = await queue.get()
+                if event is None:
+                    break
+                self._write_chunk(writer, event)
+                # Junta o que já estiver na fila em uma única escrita
+                while not queue.empty():
+                    event = queue.get_nowait()
+                    if event is None:
+                        break
+                    self._write_chunk(writer, event)
+                await writer.drain()
+            if queue in self._overflowed:
+                self._write_chunk(writer, {"error": "cliente lento: mudanças perdidas, assine de novo",
+                                           "lost": True})
+            writer.write(b"0\r\n\r\n")
+        finally:
+            self._subscribers.discard(queue)
+            self._overflowed.discard(queue)
+
+    @staticmethod
+    def _write_chunk(writer, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+    # --- Rotas ----------------------------------------------------------
+
+    def _dispatch(self, method, path, body):
+        path, _, query = path.partition("?")
+        if path == "/energy":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return self.energy_report(parse_qs(query))
+        if path == "/state":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return 200, self.home.to_dict()
+        if path in ("/commands", "/mode", "/reset"):
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                data = json.loads(body) if body else {}
+            except json.JSONDecodeError:
+                raise HTTPError(400, "JSON inválido")
+            if path == "/commands":
+                return self.apply_commands(data)
+            if path == "/mode":
+                return self.set_mode(data)
+            return self.reset()
+        raise HTTPError(404, f"rota desconhecida: {path}")
+
+    # Lote de comandos de atuadores, com as mesmas regras de modo da interface
+    def apply_commands(self, data):
+        commands = data.get("commands") if isinstance(data, dict) else data
+        if not isinstance(commands, list):
+            raise HTTPError(400, "esperado {\"commands\": [...]}")
+        for command in commands:
+            # "on" precisa ser um booleano JSON: a string "false" não pode ligar nada
+            if not isinstance(command, dict) or not isinstance(command.get("on"), bool):
+                raise HTTPError(400, "cada comando precisa de \"on\": true ou false")
+        if self.home.mode != MANUAL:
+            return 409, {"error": "comandos manuais desabilitados no modo Automático",
+                         "applied": 0, "rejected": list(range(len(commands)))}
+        applied = 0
+        rejected = []
+        for i, command in enumerate(commands):
+            try:
+                ok = self.home.command(command["room"], command["device"], command["on"])
+            except (KeyError, TypeError):
+                ok = False
+            if ok:
+                applied += 1
+            else:
+                rejected.append(i)
+        return 200, {"applied": applied, "rejected": rejected}
+
+    def set_mode(self, data):
+        mode = data.get("mode") if isinstance(data, dict) else None
+        if mode not in (MANUAL, AUTOMATIC):
+            raise HTTPError(400, f"modo deve ser {MANUAL!r} ou {AUTOMATIC!r}")
+        self.home.set_mode(mode)
+        return 200, {"mode": self.home.mode}
+
+    def reset(self):
+        if self.home.mode != MANUAL:
+            return 409, {"error": "redefinição disponível somente no modo Manual"}
+        self.home.reset_actuators()
+        return 200, self.home.to_dict()
+
+    def energy_report(self, params):
+        if self.energy is None:
+            raise HTTPError(404, "contabilidade de energia desativada")
+        period = params.get("period", ["day"])[0]
+        if period not in PERIODS:
+            raise HTTPError(400, f"período deve ser um de {', '.join(PERIODS)}")
+        return 200, self.energy.report(period)
@@ -0,0 +1,87 @@
+# Mede a latência entre uma mudança de temperatura e a reação do AC,
+# comparando o controle reativo com o laço de polling de 0,5 s.
+# Roda sem interface gráfica: python benchmarks/control_latency.py
+# Os dois modos rodam como na aplicação, em um HomeRuntime sobre um event loop: a
+# temperatura muda e o laço de polling avalia as regras na mesma thread.
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from home_core import HomeState, AUTOMATIC, AC_THRESHOLD
+from runtime import HomeRuntime, CONTROL_PERIOD
+
+# Espera máxima por uma reação do AC antes de desistir da medição
+REACTION_TIMEOUT = 10 * CONTROL_PERIOD
+
+
+# Alterna a temperatura entre quente e fria e espera o AC da Sala de Estar acompanhar
+async def measure(control, samples, jitter):
+    loop = asyncio.get_running_loop()
+    home = HomeState()
+    home.set_mode(AUTOMATIC)
+    runtime = HomeRuntime(home, control=control)
+    reacted = None
+
+    def on_change(room_key, field, value):
+        if room_key == "livingroom" and field == "ac" and not reacted.done():
+            reacted.set_result(None)
+
+    runtime.start(loop)
+    home.add_listener(on_change)
+    latencies = []
+    hot = home.temperature > AC_THRESHOLD
+    try:
+        for _ in range(samples):
+            if jitter:
+                # Fase aleatória em relação ao laço de polling
+                await asyncio.sleep(random.uniform(0, jitter))
+            hot = not hot
+            reacted = loop.create_future()
+            start = time.perf_counter()
+            home.set_temperature(AC_THRESHOLD + 2 if hot else AC_THRESHOLD - 2)
+            try:
+                await asyncio.wait_for(reacted, REACTION_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"{control}: o AC não reagiu em {REACTION_TIMEOUT} s") from None
+            latencies.append(time.perf_counter() - start)
+    finally:
+        home.remove_listener(on_change)
+        runtime.stop()
+    return latencies
+
+
+def measure_reactive(samples):
+    return asyncio.run(measure("reactive", samples, jitter=0))
+
+
+def measure_polling(samples):
+    return asyncio.run(measure("polling", samples, jitter=CONTROL_PERIOD))
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:10s} n={len(latencies):5d}  "
+          f"mediana={statistics.median(latencies) * 1e3:9.4f} ms  "
+          f"p99={p99 * 1e3:9.4f} ms  "
+          f"máx={latencies[-1] * 1e3:9.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência sensor -> atuador: reativo x polling")
+    parser.add_argument("--samples", type=int, default=1000, help="amostras no modo reativo")
+    parser.add_argument("--polling-samples", type=int, default=20, help="amostras no modo polling (cada uma leva até 0,5 s)")
+    args = parser.parse_args()
+
+    report("reativo", measure_reactive(args.samples))
+    report("polling", measure_polling(args.polling_samples))
+
+
+if __name__ == "__main__":
+    main()
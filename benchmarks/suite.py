@@ -0,0 +1,414 @@
+# Conjunto de benchmarks sem interface gráfica: vazão de leituras dos sensores,
+# latência sensor -> atuador (temperatura -> AC e passagem do mouse -> luz), custo de
+# desenho e de reconciliação da planta por número de cômodos e tempo de partida.
+# Sem display, a planta é desenhada em um canvas que só registra as chamadas.
+#
+#   python benchmarks/suite.py                       compara com benchmarks/baseline.json
+#   python benchmarks/suite.py --rooms 4,64,4096     outras quantidades de cômodos
+#   python benchmarks/suite.py --save-baseline       grava os resultados como nova referência
+#
+# A comparação usa a mediana de rodadas intercaladas, normalizada por uma carga de
+# calibração medida junto de cada benchmark, e tolera o ruído observado nas rodadas.
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from home_core import HomeState, MANUAL, AUTOMATIC, AC_THRESHOLD
+from layout import generate_layout, MotionTracker
+from rules import RuleEngine
+from bus import DeviceBus, HomeBridge
+from runtime import HomeRuntime
+from clock import VirtualClock
+from floor_plan import FloorPlanRenderer, draw_static_layer, create_room_icons
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_ROOMS = "4,64,1024"
+
+# Piora relativa, em relação à referência, a partir da qual um resultado é regressão
+# (as latências de poucos microssegundos variam bastante entre execuções)
+DEFAULT_TOLERANCE = 0.5
+# A tolerância de cada medição cresce com o ruído observado nas repetições: vale o
+# maior entre DEFAULT_TOLERANCE e NOISE_MADS desvios absolutos medianos relativos
+NOISE_MADS = 3
+# Leituras de temperatura da carga de calibração (ver bench_calibration)
+CALIBRATION_READINGS = 3000
+# Repetições mínimas para gravar uma referência (a mediana de uma só não é estável)
+MIN_BASELINE_REPEATS = 5
+
+# Cômodos desenhados por medição de renderização (passadas = RENDER_WORK / cômodos)
+RENDER_WORK = 4096
+
+HIGHER = "higher"
+LOWER = "lower"
+
+# Unidades de tempo ou de vazão, normalizadas pela calibração
+TIME_UNITS = ("ms", "µs", "leituras/s")
+
+
+# Canvas que só conta as chamadas, para medir o custo do nosso lado sem um display
+class RecordingCanvas:
+    __slots__ = ("calls", "_next_id")
+
+    def __init__(self):
+        self.calls = {}
+        self._next_id = 0
+
+    def _create(self, kind):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        self._next_id += 1
+        return self._next_id
+
+    def create_rectangle(self, *args, **kw):
+        return self._create("create_rectangle")
+
+    def create_oval(self, *args, **kw):
+        return self._create("create_oval")
+
+    def create_text(self, *args, **kw):
+        return self._create("create_text")
+
+    def create_line(self, *args, **kw):
+        return self._create("create_line")
+
+    def create_image(self, *args, **kw):
+        return self._create("create_image")
+
+    def itemconfig(self, item_id, **kw):
+        self.calls["itemconfig"] = self.calls.get("itemconfig", 0) + 1
+
+    def coords(self, item_id, *coords):
+        self.calls["coords"] = self.calls.get("coords", 0) + 1
+
+    def delete(self, *items):
+        pass
+
+    def bind(self, *args):
+        pass
+
+
+def make_canvas(tk_root, layout):
+    if tk_root is None:
+        return RecordingCanvas()
+    import tkinter as tk
+    width, height = layout.size
+    return tk.Canvas(tk_root, width=width, height=height)
+
+
+def make_home(rooms, mode=AUTOMATIC):
+    layout = generate_layout(rooms)
+    home = HomeState(layout.make_rooms(), motion_panel_rooms=layout.motion_panel_rooms)
+    home.set_mode(mode)
+    return layout, home
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+# Leituras por segundo atravessando barramento -> núcleo -> regras
+def bench_throughput(rooms, readings, seed):
+    layout, home = make_home(rooms)
+    bus = DeviceBus()
+    HomeBridge(home, bus)
+    engine = RuleEngine(home)
+    rng = random.Random(seed)
+    keys = list(home.rooms)
+    stream = []
+    for _ in range(readings):
+        if rng.random() < 0.5:
+            stream.append(("sensors/temperature", round(rng.uniform(18, 35), 1)))
+        else:
+            stream.append((f"sensors/{rng.choice(keys)}/motion", rng.random() < 0.5))
+    publish = bus.publish
+    start = time.perf_counter()
+    for topic, value in stream:
+        publish(topic, value)
+    elapsed = time.perf_counter() - start
+    engine.stop()
+    return {"throughput.readings_per_s": (readings / elapsed, "leituras/s", HIGHER)}
+
+
+# Tempo entre a mudança de um sensor e a notificação da mudança do atuador
+def bench_latency(rooms, samples):
+    reacted = {}
+
+    def on_change(room_key, field, value):
+        if field in ("light", "ac"):
+            reacted[(room_key, field)] = time.perf_counter()
+
+    # Temperatura publicada no barramento -> AC (luzes acesas para satisfazer as regras por presença)
+    layout, home = make_home(rooms)
+    bus = DeviceBus()
+    HomeBridge(home, bus)
+    engine = RuleEngine(home)
+    home.add_listener(on_change)
+    ac_room = home.ac_rooms[0]
+    for room_key in home.ac_rooms:
+        home.motion_enter(room_key)
+    temperature = []
+    hot = home.temperature > AC_THRESHOLD
+    for _ in range(samples):
+        hot = not hot
+        reacted.clear()
+        start = time.perf_counter()
+        bus.publish("sensors/temperature", AC_THRESHOLD + 2 if hot else AC_THRESHOLD - 2)
+        temperature.append(reacted[(ac_room, "ac")] - start)
+    engine.stop()
+
+    # Passagem do mouse sobre um cômodo da planta -> luz do cômodo
+    layout, home = make_home(rooms)
+    engine = RuleEngine(home)
+    home.add_listener(on_change)
+    tracker = MotionTracker(home, layout)
+    hover = []
+    for i in range(samples):
+        room = layout.rooms[i % len(layout.rooms)]
+        x1, y1, x2, y2 = room.rect
+        tracker.leave()
+        reacted.clear()
+        start = time.perf_counter()
+        tracker.move_to((x1 + x2) / 2, (y1 + y2) / 2)
+        hover.append(reacted[(room.key, "light")] - start)
+    engine.stop()
+
+    return {
+        "latency.temperature_to_ac_p50_us": (percentile(temperature, 0.5) * 1e6, "µs", LOWER),
+        "latency.temperature_to_ac_p99_us": (percentile(temperature, 0.99) * 1e6, "µs", LOWER),
+        "latency.hover_to_light_p50_us": (percentile(hover, 0.5) * 1e6, "µs", LOWER),
+        "latency.hover_to_light_p99_us": (percentile(hover, 0.99) * 1e6, "µs", LOWER),
+    }
+
+
+# Desenho completo da planta e reconciliação dos ícones (todos alterados / nenhum
+# alterado), em média por passada; plantas pequenas são repetidas para o tempo ser mensurável
+def bench_render(rooms, tk_root):
+    layout, home = make_home(rooms, mode=MANUAL)
+    passes = max(1, RENDER_WORK // rooms)
+
+    start = time.perf_counter()
+    for i in range(passes):
+        canvas = make_canvas(tk_root, layout)
+        renderer = FloorPlanRenderer(canvas)
+        draw_static_layer(canvas, layout)
+        create_room_icons(renderer, layout, home)
+        if tk_root is not None and i < passes - 1:
+            canvas.destroy()
+    draw = (time.perf_counter() - start) / passes
+
+    update_all = 0.0
+    calls_before = renderer.itemconfig_calls
+    for i in range(passes):
+        on = i % 2 == 0
+        for room in home.rooms.values():
+            home.set_light(room.key, on)
+            home.set_ac(room.key, on)
+        start = time.perf_counter()
+        for room in home.rooms.values():
+            renderer.update_room(room)
+        update_all += time.perf_counter() - start
+    calls = (renderer.itemconfig_calls - calls_before) / passes
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        for room in home.rooms.values():
+            renderer.update_room(room)
+    update_idle = (time.perf_counter() - start) / passes
+    if tk_root is not None:
+        canvas.destroy()
+    return {
+        "render.draw_ms": (draw * 1e3, "ms", LOWER),
+        "render.update_all_ms": (update_all / passes * 1e3, "ms", LOWER),
+        "render.update_idle_ms": (update_idle * 1e3, "ms", LOWER),
+        "render.itemconfig_per_room": (calls / rooms, "chamadas", LOWER),
+    }
+
+
+# Partida a frio: interpretador novo importando o runtime sem interface e a interface
+def bench_imports():
+    results = {}
+    for module in ("runtime", "smart_home"):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+        results[f"startup.import_{module}_ms"] = ((time.perf_counter() - start) * 1e3, "ms", LOWER)
+    return results
+
+
+# Montagem e partida do runtime sem interface, com um sensor de presença por cômodo
+def bench_startup(rooms):
+    results = {}
+    start = time.perf_counter()
+    layout, home = make_home(rooms)
+    runtime = HomeRuntime(home, clock=VirtualClock(), seed=0)
+    runtime.add_house_sensors()
+    for room_key in home.rooms:
+        runtime.add_motion_sensor(room_key, 1.0)
+    loop = runtime.clock.new_event_loop()
+    runtime.start(loop)
+    results["startup.headless_ms"] = ((time.perf_counter() - start) * 1e3, "ms", LOWER)
+    runtime.stop()
+    # Deixa as tarefas canceladas terminarem antes de fechar o loop
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+    return results
+
+
+# Interface completa, somente se houver um display
+def bench_gui_startup(tk_root):
+    import smart_home
+    start = time.perf_counter()
+    app = smart_home.SmartHome(tk_root)
+    tk_root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    app.stop()
+    return {"startup.gui_ms": (elapsed * 1e3, "ms", LOWER)}
+
+
+# Desvio absoluto mediano relativo à mediana (0 com uma só repetição)
+def relative_mad(values, median):
+    if not median:
+        return 0.0
+    return statistics.median(abs(v - median) for v in values) / abs(median)
+
+
+# Carga fixa pelo núcleo (leituras de temperatura reavaliando as regras), medida antes
+# e depois de cada benchmark: a velocidade da máquina varia bastante entre execuções
+# (em fases que duram de segundos a minutos), e as medições de tempo são comparadas
+# com a referência já divididas por ela
+def bench_calibration():
+    home = HomeState()
+    engine = RuleEngine(home)
+    start = time.perf_counter()
+    for i in range(CALIBRATION_READINGS):
+        home.set_temperature(20 + (i & 7))
+    elapsed = time.perf_counter() - start
+    engine.stop()
+    return elapsed * 1e3
+
+
+# Valor independente da velocidade da máquina: tempos divididos pela calibração, vazões
+# multiplicadas; contagens ficam como estão
+def normalize(value, unit, better, calibration):
+    if unit not in TIME_UNITS:
+        return value
+    return value * calibration if better == HIGHER else value / calibration
+
+
+# Mediana de cada resultado entre as repetições, mediana do valor normalizado e ruído
+# (do valor normalizado, que é o comparado com a referência)
+def summarize(runs):
+    results = {}
+    for name, (value, unit, better) in runs[0][0].items():
+        values = [run[name][0] for run, calibration in runs]
+        normalized = [normalize(run[name][0], unit, better, calibration) for run, calibration in runs]
+        median = statistics.median(normalized)
+        results[name] = (statistics.median(values), unit, better, median, relative_mad(normalized, median))
+    return results
+
+
+# As repetições são rodadas intercaladas do conjunto inteiro, e não a mesma medição
+# várias vezes seguidas, para espalhar as fases de velocidade da máquina pela execução
+def run_suite(room_counts, repeats, readings, samples, seed, tk_root):
+    benches = [(bench_imports, (), "")]
+    for rooms in room_counts:
+        suffix = f"[rooms={rooms}]"
+        benches += [(bench_throughput, (rooms, readings, seed), suffix),
+                    (bench_latency, (rooms, samples), suffix),
+                    (bench_render, (rooms, tk_root), suffix),
+                    (bench_startup, (rooms,), suffix)]
+    if tk_root is not None:
+        benches.append((bench_gui_startup, (tk_root,), ""))
+    runs = [[] for _ in benches]
+    for _ in range(repeats):
+        for i, (bench, args, suffix) in enumerate(benches):
+            before = bench_calibration()
+            result = bench(*args)
+            runs[i].append((result, (before + bench_calibration()) / 2))
+    results = {}
+    for (bench, args, suffix), bench_runs in zip(benches, runs):
+        for name, result in summarize(bench_runs).items():
+            results[name + suffix] = result
+    return results
+
+
+# A variação é a do valor normalizado pela calibração; atual e referência são os brutos
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'benchmark':52s} {'atual':>14s} {'referência':>14s} {'variação':>9s} {'limite':>7s}")
+    for name, (value, unit, better, normalized, noise) in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:52s} {value:14.3f} {'-':>14s} {'':>9s} {'':>7s}  {unit}")
+            continue
+        ref_value = reference["value"]
+        ref_normalized = reference.get("normalized", ref_value)
+        change = (normalized - ref_normalized) / ref_normalized if ref_normalized else 0.0
+        limit = max(tolerance, NOISE_MADS * max(noise, reference.get("noise", 0.0)))
+        worse = change < -limit if better == HIGHER else change > limit
+        flag = "  REGRESSÃO" if worse else ""
+        print(f"{name:52s} {value:14.3f} {ref_value:14.3f} {change:+9.1%} {limit:7.0%}  {unit}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sem interface: vazão, latência, renderização e partida")
+    parser.add_argument("--rooms", default=DEFAULT_ROOMS, help="quantidades de cômodos, separadas por vírgula")
+    parser.add_argument("--repeat", type=int, default=5, help="repetições de cada medição (vale a mediana)")
+    parser.add_argument("--readings", type=int, default=20000, help="leituras por medição de vazão")
+    parser.add_argument("--samples", type=int, default=1000, help="amostras por medição de latência")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tk", action="store_true", help="usa um canvas Tk real (requer display)")
+    parser.add_argument("--baseline", default=BASELINE, help="arquivo JSON de referência")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova referência")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="piora relativa tolerada antes de acusar regressão (0.5 = 50%%)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+    if args.save_baseline and args.repeat < MIN_BASELINE_REPEATS:
+        parser.error(f"--save-baseline requer --repeat {MIN_BASELINE_REPEATS} ou mais")
+
+    tk_root = None
+    if args.tk:
+        import tkinter as tk
+        tk_root = tk.Tk()
+        tk_root.withdraw()
+
+    room_counts = [int(n) for n in args.rooms.split(",")]
+    results = run_suite(room_counts, args.repeat, args.readings, args.samples, args.seed, tk_root)
+    if tk_root is not None:
+        tk_root.destroy()
+
+    table = {name: {"value": value, "unit": unit, "better": better, "normalized": normalized, "noise": noise}
+             for name, (value, unit, better, normalized, noise) in results.items()}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2, ensure_ascii=False)
+        print(f"referência gravada em {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressão(ões) acima do limite (tolerância de {args.tolerance:.0%} "
+              f"ou {NOISE_MADS} desvios medianos)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
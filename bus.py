@@ -0,0 +1,519 @@
+# Barramento publish/subscribe de dispositivos, com tópicos no estilo MQTT.
+#
+#   sensors/temperature, sensors/humidity, sensors/motion   leituras gerais da casa
+#   sensors/<cômodo>/motion                                  leituras por cômodo
+#   home/<campo>, home/<cômodo>/<campo>                      estado publicado pelo núcleo
+#   home/<cômodo>/<light|ac>/set, home/mode/set              comandos
+#
+# Cada assinante tem a sua fila limitada e uma política para quando ela enche
+# (descartar o mais antigo, descartar o novo ou coalescer por tópico), e recebe as
+# mensagens em lotes por uma corrotina própria: um consumidor lento, como a interface,
+# nunca segura quem publica nem os outros consumidores.
+#
+# O mesmo arquivo traz um broker local (processo separado, JSON por linha sobre TCP)
+# para dispositivos fora do processo:  python bus.py broker --port 1884
+import argparse
+import asyncio
+import json
+from collections import deque
+
+from home_core import MANUAL, AUTOMATIC
+from metrics import METRICS
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+COALESCE = "coalesce"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+DEFAULT_QUEUE = 1024
+DEFAULT_BATCH = 256
+
+BUS_MESSAGES = METRICS.counter("bus_messages_total", "Mensagens publicadas no barramento")
+BUS_DROPPED = METRICS.counter("bus_dropped_total", "Mensagens descartadas ou coalescidas por fila cheia, por assinatura")
+
+DEFAULT_BROKER_HOST = "127.0.0.1"
+DEFAULT_BROKER_PORT = 1884
+
+# Bytes pendentes no socket do BrokerLink acima dos quais as mensagens para o broker
+# são descartadas (broker parado ou lento), em vez de crescer o buffer sem limite
+LINK_WRITE_LIMIT = 1 << 20
+
+
+def topic_matches(pattern, topic):
+    if pattern == topic or pattern == "#":
+        return True
+    p_parts = pattern.split("/")
+    t_parts = topic.split("/")
+    for i, part in enumerate(p_parts):
+        if part == "#":
+            return True
+        if i >= len(t_parts) or (part != "+" and part != t_parts[i]):
+            return False
+    return len(p_parts) == len(t_parts)
+
+
+class Subscription:
+    __slots__ = ("bus", "pattern", "handler", "policy", "maxlen", "batch", "interval", "immediate",
+                 "_queue", "_wakeup", "_task", "delivered", "dropped")
+
+    def __init__(self, bus, pattern, handler, policy=DROP_OLDEST, maxlen=DEFAULT_QUEUE, batch=DEFAULT_BATCH,
+                 interval=0.0, immediate=False):
+        if policy not in POLICIES:
+            raise ValueError(f"política desconhecida: {policy}")
+        self.bus = bus
+        self.pattern = pattern
+        # handler(lista de (tópico, payload))
+        self.handler = handler
+        self.policy = policy
+        self.maxlen = maxlen
+        self.batch = batch
+        # Intervalo mínimo entre lotes (ex.: um quadro da interface)
+        self.interval = interval
+        # Entrega síncrona, dentro do publish, sem fila (para quem precisa de latência mínima)
+        self.immediate = immediate
+        self._queue = {} if policy == COALESCE else deque()
+        self._wakeup = None
+        self._task = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _drop(self):
+        self.dropped += 1
+        if METRICS.enabled:
+            BUS_DROPPED.inc(labels=(("pattern", self.pattern), ("policy", self.policy)))
+
+    def offer(self, topic, payload):
+        if self.immediate:
+            self.delivered += 1
+            self.handler([(topic, payload)])
+            return
+        queue = self._queue
+        if self.policy == COALESCE:
+            if topic in queue:
+                # Só o valor mais recente de cada tópico importa
+                queue[topic] = payload
+                self._drop()
+                return
+            if len(queue) >= self.maxlen:
+                del queue[next(iter(queue))]
+                self._drop()
+            queue[topic] = payload
+        else:
+            if len(queue) >= self.maxlen:
+                self._drop()
+                if self.policy == DROP_NEWEST:
+                    return
+                queue.popleft()
+            queue.append((topic, payload))
+        if self._wakeup is not None and not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def _take(self):
+        queue = self._queue
+        n = min(self.batch, len(queue))
+        if self.policy == COALESCE:
+            items = []
+            for _ in range(n):
+                topic = next(iter(queue))
+                items.append((topic, queue.pop(topic)))
+            return items
+        return [queue.popleft() for _ in range(n)]
+
+    def start(self, loop):
+        if self.immediate or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._queue:
+            self._wakeup.set()
+        self._task = loop.create_task(self._consume())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _consume(self):
+        wakeup = self._wakeup
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            while self._queue:
+                items = self._take()
+                self.delivered += len(items)
+                self.handler(items)
+                # Cede a vez entre lotes para não monopolizar o event loop
+                await asyncio.sleep(self.interval)
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+
+class DeviceBus:
+    __slots__ = ("_subscriptions", "_routes", "loop", "published")
+
+    def __init__(self):
+        self._subscriptions = []
+        # Cache tópico -> assinaturas que casam, invalidado a cada (des)assinatura
+        self._routes = {}
+        self.loop = None
+        self.published = 0
+
+    def subscribe(self, pattern, handler, **options):
+        subscription = Subscription(self, pattern, handler, **options)
+        self._subscriptions.append(subscription)
+        self._routes.clear()
+        if self.loop is not None:
+            subscription.start(self.loop)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.stop()
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._routes.clear()
+
+    def publish(self, topic, payload):
+        self.published += 1
+        if METRICS.enabled:
+            BUS_MESSAGES.inc()
+        routes = self._routes.get(topic)
+        if routes is None:
+            routes = tuple(s for s in self._subscriptions if topic_matches(s.pattern, topic))
+            self._routes[topic] = routes
+        for subscription in routes:
+            subscription.offer(topic, payload)
+
+    def start(self, loop=None):
+        self.loop = loop if loop is not None else asyncio.get_running_loop()
+        for subscription in self._subscriptions:
+            subscription.start(self.loop)
+
+    def stop(self):
+        for subscription in self._subscriptions:
+            subscription.stop()
+        self.loop = None
+
+
+# --- Ligação com o núcleo ---------------------------------------------------
+
+def state_topic(room_key, field):
+    return f"home/{field}" if room_key is None else f"home/{room_key}/{field}"
+
+
+# Tópico de estado -> (room_key, field); None se não for um tópico de estado
+def parse_state_topic(topic):
+    parts = topic.split("/")
+    if parts[0] != "home" or parts[-1] == "set":
+        return None
+    if len(parts) == 2:
+        return None, parts[1]
+    if len(parts) == 3:
+        return parts[1], parts[2]
+    return None
+
+
+# Aplica leituras e comandos do barramento no núcleo e publica as mudanças do núcleo
+class HomeBridge:
+    __slots__ = ("home", "bus", "_subscriptions")
+
+    def __init__(self, home, bus):
+        self.home = home
+        self.bus = bus
+        self._subscriptions = [
+            bus.subscribe("sensors/#", self.on_readings, immediate=True),
+            bus.subscribe("home/+/+/set", self.on_commands, immediate=True),
+            bus.subscribe("home/mode/set", self.on_commands, immediate=True),
+        ]
+        home.add_listener(self.on_change)
+
+    def on_change(self, room_key, field, value):
+        self.bus.publish(state_topic(room_key, field), value)
+
+    # Mensagem malformada de um dispositivo: descartada e contada como descarte da
+    # assinatura que a entregou, sem derrubar a entrega das demais
+    def _reject(self, topic):
+        for subscription in self._subscriptions:
+            if topic_matches(subscription.pattern, topic):
+                subscription._drop()
+                return
+
+    def on_readings(self, items):
+        home = self.home
+        for topic, value in items:
+            parts = topic.split("/")
+            if len(parts) == 2:
+                field = parts[1]
+                if field == "temperature" or field == "humidity":
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        self._reject(topic)
+                        continue
+                    if field == "temperature":
+                        home.set_temperature(value)
+                    else:
+                        home.set_humidity(value)
+                elif field == "motion":
+                    if not isinstance(value, bool):
+                        self._reject(topic)
+                    # Sensor de movimento do painel
+                    elif value:
+                        home.motion_detected()
+                    else:
+                        home.motion_cleared()
+            elif len(parts) == 3 and parts[2] == "motion" and parts[1] in home.rooms:
+                if not isinstance(value, bool):
+                    self._reject(topic)
+                elif value:
+                    home.motion_enter(parts[1])
+                else:
+                    home.motion_leave(parts[1])
+
+    # home/mode/set com MANUAL ou AUTOMATIC; home/<cômodo>/<light|ac>/set com um bool
+    # (a string "false" não liga nada)
+    def on_commands(self, items):
+        home = self.home
+        for topic, value in items:
+            parts = topic.split("/")
+            if len(parts) == 3 and parts[1] == "mode":
+                if value in (MANUAL, AUTOMATIC):
+                    home.set_mode(value)
+                else:
+                    self._reject(topic)
+            elif len(parts) == 4 and isinstance(value, bool):
+                home.command(parts[1], parts[2], value)
+            else:
+                self._reject(topic)
+
+    def stop(self):
+        self.home.remove_listener(self.on_change)
+        for subscription in self._subscriptions:
+            subscription.cancel()
+
+
+# --- Broker local (processo separado) ---------------------------------------
+# Protocolo: uma mensagem JSON por linha.
+#   cliente -> broker: {"sub": padrão} | {"unsub": padrão} | {"pub": tópico, "payload": valor}
+#   broker -> cliente: {"topic": tópico, "payload": valor} | {"error": mensagem}
+# Tópicos e padrões precisam ser strings; uma linha inválida recebe {"error": ...} e é
+# ignorada, sem afetar os outros clientes.
+
+class _BrokerClient:
+    __slots__ = ("writer", "patterns", "queue", "wakeup", "dropped")
+
+    def __init__(self, writer, maxlen):
+        self.writer = writer
+        self.patterns = set()
+        self.queue = deque(maxlen=maxlen)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+
+class Broker:
+    __slots__ = ("host", "port", "maxlen", "server", "_clients")
+
+    def __init__(self, host=DEFAULT_BROKER_HOST, port=DEFAULT_BROKER_PORT, maxlen=DEFAULT_QUEUE):
+        self.host = host
+        self.port = port
+        # Fila por cliente; quando enche, a mensagem mais antiga é descartada
+        self.maxlen = maxlen
+        self.server = None
+        self._clients = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def route(self, topic, payload, sender=None):
+        line = None
+        for client in self._clients:
+            if client is sender:
+                continue
+            try:
+                matched = any(topic_matches(p, topic) for p in client.patterns)
+            except (TypeError, AttributeError):
+                # Assinatura inválida só prejudica o próprio cliente
+                continue
+            if not matched:
+                continue
+            if line is None:
+                line = json.dumps({"topic": topic, "payload": payload}).encode("utf-8") + b"\n"
+            self._enqueue(client, line)
+
+    def _enqueue(self, client, line):
+        if len(client.queue) == client.queue.maxlen:
+            client.dropped += 1
+        client.queue.append(line)
+        client.wakeup.set()
+
+    def _reply_error(self, client, message):
+        self._enqueue(client, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    async def _serve(self, reader, writer):
+        client = _BrokerClient(writer, self.maxlen)
+        self._clients.add(client)
+        sender = asyncio.get_running_loop().create_task(self._send(client))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    self._reply_error(client, "linha não é JSON")
+                    continue
+                if not isinstance(message, dict):
+                    self._reply_error(client, "esperado um objeto JSON")
+                    continue
+                for key in ("pub", "sub", "unsub"):
+                    if key in message:
+                        break
+                else:
+                    self._reply_error(client, "esperado pub, sub ou unsub")
+                    continue
+                if not isinstance(message[key], str):
+                    self._reply_error(client, f"{key} precisa ser uma string")
+                    continue
+                if key == "pub":
+                    self.route(message["pub"], message.get("payload"), sender=client)
+                elif key == "sub":
+                    client.patterns.add(message["sub"])
+                else:
+                    client.patterns.discard(message["unsub"])
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    # Escreve a fila do cliente em lotes; um cliente lento só perde as próprias mensagens
+    async def _send(self, client):
+        while True:
+            await client.wakeup.wait()
+            client.wakeup.clear()
+            while client.queue:
+                data = b"".join(client.queue)
+                client.queue.clear()
+                client.writer.write(data)
+                await client.writer.drain()
+
+
+# Liga o barramento do processo a um broker: leituras e comandos que chegam do broker
+# são publicados localmente; o estado publicado pelo núcleo é repassado ao broker.
+class BrokerLink:
+    __slots__ = ("bus", "host", "port", "inbound", "outbound", "_reader", "_writer", "_task", "_subscription")
+
+    def __init__(self, bus, host=DEFAULT_BROKER_HOST, port=DEFAULT_BROKER_PORT,
+                 inbound=("sensors/#", "home/+/+/set", "home/mode/set"), outbound="home/#"):
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.inbound = inbound
+        self.outbound = outbound
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self._subscription = None
+
+    async def start(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        for pattern in self.inbound:
+            self._writer.write(json.dumps({"sub": pattern}).encode("utf-8") + b"\n")
+        self._subscription = self.bus.subscribe(self.outbound, self._forward, policy=DROP_OLDEST)
+        self._task = asyncio.get_running_loop().create_task(self._receive())
+        return self
+
+    def _forward(self, items):
+        lines = [json.dumps({"pub": topic, "payload": payload}).encode("utf-8") + b"\n"
+                 for topic, payload in items if not topic.endswith("/set")]
+        if not lines:
+            return
+        if self._writer.transport.get_write_buffer_size() > LINK_WRITE_LIMIT:
+            # Broker parado ou lento: descarta o lote, contado como descarte da assinatura
+            for _ in lines:
+                self._subscription._drop()
+            return
+        self._writer.write(b"".join(lines))
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+                topic, payload = message["topic"], message["payload"]
+            except (json.JSONDecodeError, TypeError, KeyError):
+                continue
+            if not isinstance(topic, str):
+                continue
+            self.bus.publish(topic, payload)
+
+    def stop(self):
+        if self._subscription is not None:
+            self._subscription.cancel()
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_BROKER_HOST, int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker local e ferramentas do barramento de dispositivos")
+    parser.add_argument("--host", default=DEFAULT_BROKER_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_BROKER_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("broker", help="roda o broker")
+    pub = commands.add_parser("pub", help="publica um valor JSON em um tópico")
+    pub.add_argument("topic")
+    pub.add_argument("payload", help="valor JSON, ex.: 31.5, true, \"Automático\"")
+    sub = commands.add_parser("sub", help="mostra as mensagens de um padrão de tópicos")
+    sub.add_argument("pattern")
+    args = parser.parse_args()
+
+    async def run():
+        if args.command == "broker":
+            await Broker(args.host, args.port).serve_forever()
+            return
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        if args.command == "pub":
+            message = {"pub": args.topic, "payload": json.loads(args.payload)}
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(json.dumps({"sub": args.pattern}).encode("utf-8") + b"\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "error" in message:
+                print("erro:", message["error"])
+            else:
+                print(message["topic"], json.dumps(message["payload"], ensure_ascii=False))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Relógios da simulação. WallClock segue o tempo real; VirtualClock avança o tempo
+# de um event loop asyncio direto para o próximo timer agendado (eventos discretos):
+# o tempo ocioso entre os eventos não custa nada, e a execução é repetível. O custo
+# passa a ser proporcional ao número de eventos (leituras e mudanças), não à duração.
+import asyncio
+import selectors
+import time
+
+
+class WallClock:
+    __slots__ = ()
+
+    def now(self):
+        return time.time()
+
+    def strftime(self, fmt):
+        return time.strftime(fmt, time.localtime(self.now()))
+
+    def new_event_loop(self):
+        return asyncio.new_event_loop()
+
+    def run(self, coro):
+        loop = self.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+
+class VirtualClock(WallClock):
+    __slots__ = ("start", "_time")
+
+    # start: instante Unix correspondente ao tempo virtual zero
+    def __init__(self, start=0.0):
+        self.start = start
+        self._time = 0.0
+
+    def now(self):
+        return self.start + self._time
+
+    def elapsed(self):
+        return self._time
+
+    # Event loop cujo relógio é virtual: quando não há nada pronto para rodar, o
+    # seletor avança o tempo até o próximo timer em vez de dormir
+    def new_event_loop(self):
+        return VirtualEventLoop(self)
+
+    def advance(self, seconds):
+        self._time += seconds
+
+
+# Seletor que nunca dorme: consulta a E/S real sem esperar e, se não houver nada,
+# soma ao relógio virtual o tempo que o loop dormiria até o próximo timer
+class _VirtualSelector(selectors.DefaultSelector):
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # Nada agendado: só resta esperar E/S real
+            return super().select(None)
+        events = super().select(0)
+        if not events and timeout > 0:
+            self.clock.advance(timeout)
+        return events
+
+
+# Loop asyncio guiado por um VirtualClock, pelos ganchos públicos do asyncio: o
+# seletor passado ao SelectorEventLoop e o método time()
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self, clock):
+        super().__init__(selector=_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.elapsed()
@@ -0,0 +1,171 @@
+# Estado em colunas para muitas casas e cômodos: uma matriz (casas x cômodos) para
+# temperatura, umidade, ocupação, luz e AC. A geração dos sensores (deriva por cômodo
+# com ciclo diário e ruído) e as regras declarativas de rules.py rodam como operações
+# vetorizadas do NumPy, em vez de um ramo Python por cômodo a cada passo.
+import math
+
+import numpy as np
+
+from layout import generate_layout
+from rules import DEFAULT_RULES, OPERATORS, validate_rule
+
+DAY = 86400.0
+
+# Modelo de temperatura: Ornstein-Uhlenbeck em torno de uma base por cômodo + ciclo diário
+TEMP_BASE = (20.0, 30.0)
+TEMP_DAILY_AMPLITUDE = 4.0
+TEMP_REVERSION = 1 / 1800      # 1/s
+TEMP_NOISE = 0.02              # °C/sqrt(s)
+
+HUMIDITY_BASE = (35.0, 65.0)
+HUMIDITY_REVERSION = 1 / 3600
+HUMIDITY_NOISE = 0.05
+
+# Colunas de estado consultadas pelas regras (nome do campo da regra -> atributo)
+RULE_COLUMNS = {
+    "temperature": "temperature",
+    "humidity": "humidity",
+    "motion": "occupancy",
+    "light": "light",
+    "ac": "ac",
+}
+
+
+class ColumnarHomes:
+    __slots__ = ("layout", "n_homes", "n_rooms", "rngs", "room_index", "has_ac", "ac_presence", "automatic",
+                 "temperature", "humidity", "occupancy", "light", "ac",
+                 "temp_base", "temp_phase", "humidity_base", "occupancy_p",
+                 "light_seconds", "ac_seconds", "firings", "home_firings", "transitions", "_rules", "_previous",
+                 "time")
+
+    def __init__(self, n_homes, layout=None, seed=0, occupancy=0.3, rules=DEFAULT_RULES, first_home=0):
+        self.layout = layout if layout is not None else generate_layout(8)
+        rooms = self.layout.rooms
+        self.n_homes = n_homes
+        self.n_rooms = len(rooms)
+        # Um gerador por casa, filho de SeedSequence(seed) pelo número global da casa:
+        # a casa i tem a mesma sequência em qualquer lote em que cair
+        self.rngs = [np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(home,)))
+                     for home in range(first_home, first_home + n_homes)]
+        self.room_index = {room.key: i for i, room in enumerate(rooms)}
+        shape = (n_homes, self.n_rooms)
+
+        # Atributos fixos dos cômodos (iguais em todas as casas desta planta)
+        self.has_ac = np.array([room.has_ac for room in rooms], dtype=bool)
+        self.ac_presence = np.array([room.ac_presence for room in rooms], dtype=bool)
+        self.automatic = np.ones(n_homes, dtype=bool)
+
+        # Estado: uma coluna por grandeza, uma linha por casa
+        n_rooms = self.n_rooms
+        self.temp_base = self._per_home(n_rooms, lambda rng: rng.uniform(*TEMP_BASE, size=n_rooms))
+        self.temp_phase = self._per_home(1, lambda rng: rng.uniform(0, 2 * math.pi, size=1))
+        self.humidity_base = self._per_home(n_rooms, lambda rng: rng.uniform(*HUMIDITY_BASE, size=n_rooms))
+        self.temperature = self.temp_base.copy()
+        self.humidity = self.humidity_base.copy()
+        self.occupancy = np.zeros(shape, dtype=bool)
+        self.occupancy_p = occupancy
+        self.light = np.zeros(shape, dtype=bool)
+        self.ac = np.zeros(shape, dtype=bool)
+
+        # Acumuladores por casa
+        self.light_seconds = np.zeros(n_homes)
+        self.ac_seconds = np.zeros(n_homes)
+        # Transições liga/desliga de luz e AC, como EnergyMeter.transitions
+        self.transitions = np.zeros(n_homes, dtype=np.int64)
+        # Disparos como em RuleEngine.firings: avaliações com a condição satisfeita
+        self.home_firings = np.zeros(n_homes, dtype=np.int64)
+        # Disparos por regra, somados em todas as casas
+        self.firings = {}
+        self._rules = [self._compile(rule) for rule in rules]
+        # Colunas consultadas pelas regras como estavam no fim do passo anterior
+        self._previous = None
+        self.time = 0.0
+
+    # Uma linha por casa, cada uma tirada do gerador da própria casa
+    def _per_home(self, width, draw):
+        if not self.rngs:
+            return np.zeros((0, width))
+        return np.stack([draw(rng) for rng in self.rngs])
+
+    # Converte uma regra declarativa em máscara de cômodos + condições sobre colunas
+    def _compile(self, rule):
+        validate_rule(rule)
+        selector = rule.get("rooms", "*")
+        if selector == "*":
+            mask = np.ones(self.n_rooms, dtype=bool)
+        elif isinstance(selector, dict):
+            mask = np.ones(self.n_rooms, dtype=bool)
+            for attr, value in selector.items():
+                column = np.array([getattr(room, attr) for room in self.layout.rooms])
+                mask &= column == value
+        else:
+            mask = np.zeros(self.n_rooms, dtype=bool)
+            for key in selector:
+                if key in self.room_index:
+                    mask[self.room_index[key]] = True
+        target = RULE_COLUMNS[rule["set"]]
+        if target == "ac":
+            mask &= self.has_ac
+        conditions = [(RULE_COLUMNS[field], OPERATORS[op], value) for field, op, value in rule["when"]]
+        self.firings.setdefault(rule["name"], 0)
+        return rule["name"], mask, conditions, target, rule.get("then"), rule.get("else")
+
+    # Deriva e ruído de todos os sensores de todas as casas em poucas operações
+    def step_sensors(self, dt):
+        n_rooms = self.n_rooms
+        noise = self._per_home(2 * n_rooms, lambda rng: rng.standard_normal(2 * n_rooms))
+        daily = TEMP_DAILY_AMPLITUDE * np.sin(2 * math.pi * self.time / DAY + self.temp_phase)
+        target = self.temp_base + daily
+        self.temperature += TEMP_REVERSION * dt * (target - self.temperature)
+        self.temperature += TEMP_NOISE * math.sqrt(dt) * noise[:, :n_rooms]
+        self.humidity += HUMIDITY_REVERSION * dt * (self.humidity_base - self.humidity)
+        self.humidity += HUMIDITY_NOISE * math.sqrt(dt) * noise[:, n_rooms:]
+        np.clip(self.humidity, 0.0, 100.0, out=self.humidity)
+
+    # Sensores de presença: cada cômodo é relido com probabilidade dt / período
+    def step_occupancy(self, dt, period):
+        n_rooms = self.n_rooms
+        draws = self._per_home(2 * n_rooms, lambda rng: rng.random(2 * n_rooms))
+        refresh = draws[:, :n_rooms] < min(1.0, dt / period)
+        present = draws[:, n_rooms:] < self.occupancy_p
+        self.occupancy = np.where(refresh, present, self.occupancy)
+
+    # Aplica as regras em ordem, como a cascata do motor reativo (luz antes do AC). Como
+    # no motor reativo, que só reavalia uma regra quando muda uma coluna da condição, um
+    # disparo só conta nos cômodos em que alguma dessas colunas mudou desde o passo
+    # anterior (no primeiro passo todas são avaliadas, como em add_rule)
+    def evaluate_rules(self):
+        active = self.automatic[:, None]
+        previous = self._previous
+        for name, mask, conditions, target, then_value, else_value in self._rules:
+            matched = np.broadcast_to(mask, self.light.shape) & active
+            evaluated = previous is None
+            for column, op, value in conditions:
+                values = getattr(self, column)
+                matched = matched & op(values, value)
+                if previous is not None:
+                    evaluated = evaluated | (values != previous[column])
+            hits = np.count_nonzero(matched & evaluated, axis=1)
+            self.home_firings += hits
+            self.firings[name] += int(hits.sum())
+            current = getattr(self, target)
+            new = current
+            if then_value is not None:
+                new = np.where(matched, then_value, new)
+            if else_value is not None:
+                new = np.where(mask & active & ~matched, else_value, new)
+            self.transitions += np.count_nonzero(new != current, axis=1)
+            setattr(self, target, new)
+        self._previous = {column: getattr(self, column).copy() for column in RULE_COLUMNS.values()}
+
+    def step(self, dt, motion_period):
+        self.step_sensors(dt)
+        self.step_occupancy(dt, motion_period)
+        self.evaluate_rules()
+        self.light_seconds += np.count_nonzero(self.light, axis=1) * dt
+        self.ac_seconds += np.count_nonzero(self.ac, axis=1) * dt
+        self.time += dt
+
+    def run(self, duration, dt=60.0, motion_period=300.0):
+        for _ in range(int(duration // dt)):
+            self.step(dt, motion_period)
@@ -0,0 +1,201 @@
+# Contabilidade incremental de energia e tempo ligado dos atuadores. Cada transição
+# de luz ou AC acrescenta um ponto de quebra às séries do atuador, do cômodo e da casa,
+# guardando os totais acumulados (energia e tempo ligado) e as taxas vigentes a partir
+# dali. O acumulado em qualquer instante é o do ponto anterior mais taxa x tempo, então
+# uma janela (última hora, dia, mês) custa duas buscas binárias, sem reler o histórico,
+# e o total até agora sai em tempo constante.
+from array import array
+from bisect import bisect_right
+
+from clock import WallClock
+
+# Potência nominal dos atuadores, em watts
+LIGHT_POWER_W = 10.0
+AC_POWER_W = 1200.0
+
+DEVICES = ("light", "ac")
+
+# Janelas de consulta, em segundos
+PERIODS = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+JOULES_PER_KWH = 3_600_000
+
+
+class EnergyTrack:
+    __slots__ = ("_times", "_energy", "_active", "_power", "_count")
+
+    def __init__(self):
+        # Por ponto de quebra: instante, energia acumulada (J), tempo ligado acumulado
+        # (s x dispositivos), potência (W) e dispositivos ligados a partir dali
+        self._times = array("d")
+        self._energy = array("d")
+        self._active = array("d")
+        self._power = array("d")
+        self._count = array("d")
+
+    def __len__(self):
+        return len(self._times)
+
+    @property
+    def power(self):
+        return self._power[-1] if self._power else 0.0
+
+    @property
+    def count(self):
+        return self._count[-1] if self._count else 0.0
+
+    # Passa a valer `power` watts com `count` dispositivos ligados a partir de t
+    def set_rate(self, t, power, count):
+        times = self._times
+        if times:
+            i = len(times) - 1
+            if t <= times[i]:
+                # Mesmo instante (ou relógio voltou): só troca as taxas do último ponto
+                self._power[i] = power
+                self._count[i] = count
+                return
+            dt = t - times[i]
+            energy = self._energy[i] + self._power[i] * dt
+            active = self._active[i] + self._count[i] * dt
+        else:
+            energy = active = 0.0
+        times.append(t)
+        self._energy.append(energy)
+        self._active.append(active)
+        self._power.append(power)
+        self._count.append(count)
+
+    # Soma a variação de potência e de dispositivos ligados a partir de t
+    def add_rate(self, t, power, count):
+        self.set_rate(t, self.power + power, self.count + count)
+
+    # (energia em J, tempo ligado em s) acumulados até t
+    def at(self, t):
+        times = self._times
+        i = len(times) - 1
+        if i < 0 or t < times[0]:
+            return 0.0, 0.0
+        if t < times[i]:
+            i = bisect_right(times, t) - 1
+        dt = t - times[i]
+        return self._energy[i] + self._power[i] * dt, self._active[i] + self._count[i] * dt
+
+    def between(self, since, until):
+        e0, a0 = self.at(since)
+        e1, a1 = self.at(until)
+        return e1 - e0, a1 - a0
+
+
+class EnergyMeter:
+    __slots__ = ("home", "clock", "power_w", "devices", "rooms", "house", "transitions")
+
+    def __init__(self, home, clock=None, light_power=LIGHT_POWER_W, ac_power=AC_POWER_W):
+        self.home = home
+        self.clock = clock if clock is not None else WallClock()
+        self.power_w = {"light": light_power, "ac": ac_power}
+        # Séries por atuador (room_key, device), por cômodo e da casa inteira
+        self.devices = {}
+        self.rooms = {}
+        self.house = EnergyTrack()
+        # Transições liga/desliga dos atuadores
+        self.transitions = 0
+        now = self.clock.now()
+        for room in home.rooms.values():
+            track = self.rooms[room.key] = EnergyTrack()
+            track.set_rate(now, 0.0, 0.0)
+            for device in DEVICES:
+                if device == "ac" and not room.has_ac:
+                    continue
+                on = room.light_on if device == "light" else room.ac_on
+                self.devices[(room.key, device)] = EnergyTrack()
+                self.devices[(room.key, device)].set_rate(now, self.power_w[device] if on else 0.0, float(on))
+                if on:
+                    track.add_rate(now, self.power_w[device], 1.0)
+        self.house.set_rate(now, sum(t.power for t in self.rooms.values()),
+                            sum(t.count for t in self.rooms.values()))
+        home.add_listener(self.on_change)
+
+    def on_change(self, room_key, field, value):
+        track = self.devices.get((room_key, field))
+        if track is None:
+            return
+        on = 1.0 if value else 0.0
+        delta = on - track.count
+        if not delta:
+            return
+        self.transitions += 1
+        now = self.clock.now()
+        power = self.power_w[field]
+        track.set_rate(now, power * on, on)
+        self.rooms[room_key].add_rate(now, power * delta, delta)
+        self.house.add_rate(now, power * delta, delta)
+
+    def stop(self):
+        self.home.remove_listener(self.on_change)
+
+    # Séries que compõem a consulta: um atuador, um cômodo, um tipo de dispositivo em
+    # todos os cômodos (room_key None) ou a casa inteira
+    def _tracks(self, room_key=None, device=None):
+        if device is not None:
+            if room_key is None:
+                return [t for (key, d), t in self.devices.items() if d == device]
+            track = self.devices.get((room_key, device))
+            return [track] if track is not None else []
+        if room_key is not None:
+            track = self.rooms.get(room_key)
+            return [track] if track is not None else []
+        return [self.house]
+
+    def _window(self, since, until):
+        until = self.clock.now() if until is None else until
+        since = 0.0 if since is None else since
+        return since, until
+
+    # Potência instantânea (W)
+    def power(self, room_key=None, device=None):
+        return sum(track.power for track in self._tracks(room_key, device))
+
+    def energy_kwh(self, room_key=None, device=None, since=None, until=None):
+        since, until = self._window(since, until)
+        return sum(track.between(since, until)[0] for track in self._tracks(room_key, device)) / JOULES_PER_KWH
+
+    # Tempo ligado em segundos (somado entre os dispositivos quando há mais de um)
+    def on_seconds(self, room_key=None, device=None, since=None, until=None):
+        since, until = self._window(since, until)
+        return sum(track.between(since, until)[1] for track in self._tracks(room_key, device))
+
+    # Fração da janela em que o atuador ficou ligado
+    def duty_cycle(self, room_key, device, since, until=None):
+        since, until = self._window(since, until)
+        if until <= since:
+            return 0.0
+        return self.on_seconds(room_key, device, since, until) / (until - since)
+
+    # Consumo por cômodo em uma das janelas de PERIODS, terminando agora
+    def report(self, period="day"):
+        until = self.clock.now()
+        since = until - PERIODS[period]
+        rooms = {}
+        for room_key in self.rooms:
+            entry = {"kwh": round(self.energy_kwh(room_key, since=since, until=until), 6),
+                     "power_w": self.power(room_key)}
+            for device in DEVICES:
+                if (room_key, device) in self.devices:
+                    entry[f"{device}_hours"] = round(self.on_seconds(room_key, device, since, until) / 3600, 6)
+            rooms[room_key] = entry
+        return {
+            "period": period,
+            "since": since,
+            "until": until,
+            "kwh": round(self.energy_kwh(since=since, until=until), 6),
+            "power_w": self.power(),
+            "rooms": rooms,
+        }
+
+
+# Resumo de uma linha para a interface e para o modo sem interface
+def format_usage(meter):
+    now = meter.clock.now()
+    hour = meter.energy_kwh(since=now - PERIODS["hour"], until=now)
+    day = meter.energy_kwh(since=now - PERIODS["day"], until=now)
+    return f"{meter.power():.0f} W agora | {hour:.3f} kWh na última hora | {day:.2f} kWh em 24 h"
@@ -0,0 +1,255 @@
+# Log binário de eventos, somente de acréscimo: cada mudança de estado da casa
+# (sensores, atuadores e modo) vira um registro de tamanho fixo. As escritas são
+# agrupadas em lotes com um único write + fsync por lote, e a leitura usa mmap para
+# varrer ou buscar por timestamp sem carregar o arquivo inteiro.
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from home_core import MANUAL, AUTOMATIC
+
+MAGIC = b"CASALOG1"
+HEADER = struct.Struct("<8sI")
+# timestamp (f64), índice do cômodo (u16), campo (u8), preenchimento, valor (f64)
+RECORD = struct.Struct("<dHBxd")
+
+# Índice de cômodo usado para o estado geral da casa
+HOUSE = 0xFFFF
+
+FIELDS = ("temperature", "humidity", "motion", "mode", "light", "ac")
+FIELD_CODES = {field: code for code, field in enumerate(FIELDS)}
+MODES = (MANUAL, AUTOMATIC)
+
+DEFAULT_BATCH = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def _encode_value(field, value):
+    if field == "mode":
+        return float(MODES.index(value))
+    return float(value)
+
+
+def _decode_value(field, value):
+    if field == "mode":
+        return MODES[int(value)]
+    if field in ("temperature", "humidity"):
+        return value
+    return bool(value)
+
+
+# Metadados, tamanho do cabeçalho e identidade do log: o CRC32 do cabeçalho, que
+# inclui um id aleatório gerado na criação, então um log apagado e recriado com os
+# mesmos cômodos não se passa pelo anterior
+def _read_header(f):
+    header = f.read(HEADER.size)
+    magic, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("arquivo não é um log de eventos da casa")
+    raw = f.read(length)
+    meta = json.loads(raw.decode("utf-8"))
+    return meta, HEADER.size + length, zlib.crc32(header + raw)
+
+
+class EventLog:
+    __slots__ = ("path", "rooms", "batch_size", "flush_interval", "clock", "records", "identity", "_room_index",
+                 "_fd", "_buffer", "_pending", "_last_flush", "_lock")
+
+    def __init__(self, path, rooms, batch_size=DEFAULT_BATCH, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 clock=time.time):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        rooms = list(rooms)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Continua um log existente: a tabela de cômodos do cabeçalho manda
+            with open(path, "rb") as f:
+                meta, offset, self.identity = _read_header(f)
+            # Registros já gravados (os snapshots guardam até onde o log já foi aplicado)
+            size = os.path.getsize(path)
+            self.records = (size - offset) // RECORD.size
+            missing = [key for key in rooms if key not in meta["rooms"]]
+            if missing:
+                raise ValueError(f"cômodos ausentes no log {path}: {', '.join(missing)}")
+            rooms = meta["rooms"]
+            self._fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+            # Um registro incompleto no fim (queda no meio de uma escrita) é cortado antes
+            # de acrescentar, senão todos os registros seguintes ficariam desalinhados
+            end = offset + self.records * RECORD.size
+            if size > end:
+                os.ftruncate(self._fd, end)
+                os.fsync(self._fd)
+                print(f"{path}: {size - end} bytes de um registro incompleto descartados", file=sys.stderr)
+        else:
+            self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            meta = json.dumps({"id": os.urandom(8).hex(), "rooms": rooms, "fields": FIELDS,
+                               "modes": MODES}).encode("utf-8")
+            header = HEADER.pack(MAGIC, len(meta)) + meta
+            os.write(self._fd, header)
+            os.fsync(self._fd)
+            self.identity = zlib.crc32(header)
+            self.records = 0
+
+        self.rooms = rooms
+        self._room_index = {key: i for i, key in enumerate(rooms)}
+        self._buffer = bytearray(RECORD.size * batch_size)
+        self._pending = 0
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    # Listener do núcleo: registra a mudança no lote em memória
+    def on_change(self, room_key, field, value):
+        code = FIELD_CODES.get(field)
+        if code is None:
+            return
+        room = HOUSE if room_key is None else self._room_index[room_key]
+        self.append(self.clock(), room, code, _encode_value(field, value))
+
+    def append(self, timestamp, room, code, value):
+        with self._lock:
+            RECORD.pack_into(self._buffer, self._pending * RECORD.size, timestamp, room, code, value)
+            self._pending += 1
+            self.records += 1
+            if self._pending >= self.batch_size or timestamp - self._last_flush >= self.flush_interval:
+                self._flush_locked(timestamp)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked(self.clock())
+
+    def _flush_locked(self, now):
+        if self._pending:
+            os.write(self._fd, memoryview(self._buffer)[:self._pending * RECORD.size])
+            os.fsync(self._fd)
+            self._pending = 0
+        self._last_flush = now
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            self._flush_locked(self.clock())
+            os.close(self._fd)
+            self._fd = None
+
+
+class EventLogReader:
+    __slots__ = ("path", "rooms", "identity", "_file", "_map", "_offset", "_count")
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        meta, self._offset, self.identity = _read_header(self._file)
+        self.rooms = meta["rooms"]
+        size = os.fstat(self._file.fileno()).st_size
+        # Um registro incompleto no fim (queda no meio de uma escrita) é ignorado
+        self._count = (size - self._offset) // RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _raw(self, i):
+        return RECORD.unpack_from(self._map, self._offset + i * RECORD.size)
+
+    def timestamp(self, i):
+        return struct.unpack_from("<d", self._map, self._offset + i * RECORD.size)[0]
+
+    # Registro decodificado: (timestamp, room_key, field, value)
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        timestamp, room, code, value = self._raw(i)
+        field = FIELDS[code]
+        room_key = None if room == HOUSE else self.rooms[room]
+        return timestamp, room_key, field, _decode_value(field, value)
+
+    # Primeiro registro com timestamp >= t (os timestamps são gravados em ordem)
+    def bisect(self, t):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def scan(self, start=None, end=None, first=0):
+        if start is not None:
+            first = max(first, self.bisect(start))
+        for i in range(first, self._count):
+            record = self[i]
+            if end is not None and record[0] >= end:
+                return
+            yield record
+
+    # Reconstrói o estado da casa aplicando os registros a partir do índice `first` até `until`
+    def replay(self, home, until=None, first=0):
+        applied = 0
+        for timestamp, room_key, field, value in self.scan(end=until, first=first):
+            if room_key is not None and room_key not in home.rooms:
+                continue
+            if field == "temperature":
+                home.set_temperature(value)
+            elif field == "humidity":
+                home.set_humidity(value)
+            elif field == "mode":
+                home.set_mode(value)
+            elif field == "motion":
+                if room_key is None:
+                    home.set_motion(value)
+                else:
+                    home.set_room_motion(room_key, value)
+            elif field == "light":
+                home.set_light(room_key, value)
+            elif field == "ac":
+                home.set_ac(room_key, value)
+            applied += 1
+        return applied
+
+
+# Restaura o estado a partir de um log existente e passa a registrar novas mudanças nele.
+# Com `first` e `identity` (ex.: vindos de um snapshot), só os registros a partir de
+# `first` são reproduzidos; se a identidade não bater ou o log tiver menos registros que
+# isso, não é o mesmo log e ele é reproduzido inteiro
+def open_event_log(path, home, first=0, identity=None, **kwargs):
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with EventLogReader(path) as reader:
+            if identity != reader.identity or first > len(reader):
+                first = 0
+            reader.replay(home, first=first)
+    log = EventLog(path, list(home.rooms), **kwargs)
+    home.add_listener(log.on_change)
+    return log
+
+
+if __name__ == "__main__":
+    # Lista os registros de um log: python event_log.py casa.log [início] [fim]
+    start = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    end = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    with EventLogReader(sys.argv[1]) as reader:
+        for timestamp, room_key, field, value in reader.scan(start, end):
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+            print(f"{when} {room_key or '-'} {field} {value}")
@@ -0,0 +1,204 @@
+# Modo frota: simula muitas casas sem interface, divididas em lotes entre os núcleos
+# da máquina (multiprocessing). Cada processo roda o seu lote em um único event loop
+# com relógio virtual; as estatísticas de cada casa voltam por memória compartilhada
+# (uma linha de doubles por casa) e são agregadas no processo principal.
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from array import array
+from multiprocessing import Pool, shared_memory
+
+from clock import VirtualClock
+from energy import EnergyMeter, LIGHT_POWER_W, AC_POWER_W
+from home_core import HomeState, AUTOMATIC
+from layout import generate_layout, load_layout
+from runtime import HomeRuntime
+
+# Colunas da tabela de resultados (uma linha por casa), com o mesmo significado nos
+# dois modos: rule_firings conta as avaliações de regra com a condição satisfeita e
+# transitions as vezes que uma luz ou um AC ligou ou desligou. Os modelos dos sensores
+# diferem (no vetorizado, temperatura e umidade são por cômodo e mudam a cada passo de
+# sensor_period), então os valores de uma mesma semente não são iguais entre os modos.
+STATS = ("rooms", "energy_kwh", "ac_duty", "light_hours", "rule_firings", "transitions")
+NSTATS = len(STATS)
+
+DEFAULT_SHARD = 64
+
+# Defasagem (s) entre os produtores de uma mesma casa: sem empates entre os timers da
+# casa, o resultado de cada casa não depende de --shard nem de --workers
+PRODUCER_STAGGER = 1e-3
+
+
+def _home_layout(home_id, seed, layout_path):
+    if layout_path:
+        return load_layout(layout_path)
+    # Cada casa tem a sua própria planta, de 4 a 12 cômodos
+    return generate_layout(random.Random(seed * 1_000_003 + home_id).randint(4, 12))
+
+
+# Executado em um processo do pool: simula as casas [first, last) e grava uma linha
+# de estatísticas por casa na memória compartilhada
+def simulate_shard(job):
+    shm_name, first, last, options = job
+    clock = VirtualClock(start=0.0)
+    homes = []
+    for home_id in range(first, last):
+        layout = _home_layout(home_id, options["seed"], options["layout"])
+        home = HomeState(layout.make_rooms(), motion_panel_rooms=layout.motion_panel_rooms)
+        home.set_mode(AUTOMATIC)
+        runtime = HomeRuntime(home, clock=clock, seed=f"{options['seed']}:{home_id}",
+                              stagger=PRODUCER_STAGGER)
+        runtime.add_house_sensors(period=options["sensor_period"])
+        for room_key in home.rooms:
+            runtime.add_motion_sensor(room_key, options["motion_period"], options["occupancy"])
+        homes.append((home, runtime, EnergyMeter(home, clock)))
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        for home, runtime, meter in homes:
+            runtime.start(loop)
+        await asyncio.sleep(options["duration"])
+        for home, runtime, meter in homes:
+            runtime.stop()
+
+    clock.run(run_all())
+
+    duration = options["duration"]
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = shm.buf.cast("d")
+        for offset, (home, runtime, meter) in enumerate(homes):
+            light_s = meter.on_seconds(device="light")
+            ac_s = meter.on_seconds(device="ac")
+            row = (first + offset) * NSTATS
+            table[row + 0] = len(home.rooms)
+            table[row + 1] = meter.energy_kwh()
+            table[row + 2] = ac_s / (duration * len(home.ac_rooms)) if home.ac_rooms else 0.0
+            table[row + 3] = light_s / 3600
+            table[row + 4] = sum(runtime.engine.firings.values())
+            table[row + 5] = meter.transitions
+        table.release()
+    finally:
+        shm.close()
+    return last - first
+
+
+# Variante vetorizada (columnar.py, requer NumPy): o lote inteiro é uma matriz
+# casas x cômodos avançada em passos de sensor_period segundos
+def simulate_shard_vectorized(job):
+    from columnar import ColumnarHomes
+
+    shm_name, first, last, options = job
+    layout = load_layout(options["layout"]) if options["layout"] else generate_layout(options["rooms"])
+    homes = ColumnarHomes(last - first, layout, seed=options["seed"], first_home=first,
+                          occupancy=options["occupancy"])
+    duration = options["duration"]
+    homes.run(duration, dt=options["sensor_period"], motion_period=options["motion_period"])
+
+    n_ac = int(homes.has_ac.sum())
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = shm.buf.cast("d")
+        for offset in range(last - first):
+            light_s = float(homes.light_seconds[offset])
+            ac_s = float(homes.ac_seconds[offset])
+            row = (first + offset) * NSTATS
+            table[row + 0] = homes.n_rooms
+            table[row + 1] = (light_s * LIGHT_POWER_W + ac_s * AC_POWER_W) / 3_600_000
+            table[row + 2] = ac_s / (duration * n_ac) if n_ac else 0.0
+            table[row + 3] = light_s / 3600
+            table[row + 4] = float(homes.home_firings[offset])
+            table[row + 5] = float(homes.transitions[offset])
+        table.release()
+    finally:
+        shm.close()
+    return last - first
+
+
+def run_fleet(homes, duration, workers=None, shard=DEFAULT_SHARD, seed=0, sensor_period=60.0,
+              motion_period=300.0, occupancy=0.3, layout=None, vectorized=False, rooms=8):
+    options = {
+        "duration": duration,
+        "seed": seed,
+        "sensor_period": sensor_period,
+        "motion_period": motion_period,
+        "occupancy": occupancy,
+        "layout": layout,
+        "rooms": rooms,
+    }
+    simulate = simulate_shard_vectorized if vectorized else simulate_shard
+    shm = shared_memory.SharedMemory(create=True, size=max(8, homes * NSTATS * 8))
+    try:
+        jobs = [(shm.name, first, min(first + shard, homes), options) for first in range(0, homes, shard)]
+        with Pool(workers or os.cpu_count()) as pool:
+            for _ in pool.imap_unordered(simulate, jobs):
+                pass
+        table = shm.buf.cast("d")
+        results = array("d", table[:homes * NSTATS])
+        table.release()
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
+
+
+# Estatísticas agregadas da frota: soma, média e percentis de cada coluna (vazio sem casas)
+def summarize(results):
+    summary = {}
+    if not len(results):
+        return summary
+    for col, name in enumerate(STATS):
+        values = sorted(results[col::NSTATS])
+        summary[name] = {
+            "total": sum(values),
+            "mean": statistics.fmean(values),
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula uma frota de casas em paralelo")
+    parser.add_argument("--homes", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=24.0, help="tempo simulado por casa")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--shard", type=int, default=DEFAULT_SHARD, help="casas por lote enviado a um processo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sensor-period", type=float, default=60.0, help="período dos sensores de temperatura/umidade (s)")
+    parser.add_argument("--motion-period", type=float, default=300.0, help="período dos sensores de presença (s)")
+    parser.add_argument("--occupancy", type=float, default=0.3, help="probabilidade de presença em cada leitura")
+    parser.add_argument("--layout", help="planta JSON usada por todas as casas (padrão: plantas geradas)")
+    parser.add_argument("--csv", help="grava as estatísticas de cada casa neste arquivo")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="simula cada lote como matrizes NumPy (casas x cômodos) em vez de uma casa por vez")
+    parser.add_argument("--rooms", type=int, default=8, help="cômodos por casa no modo vetorizado sem --layout")
+    args = parser.parse_args()
+    if args.homes < 1:
+        parser.error("--homes precisa ser pelo menos 1")
+
+    start = time.perf_counter()
+    results = run_fleet(args.homes, args.hours * 3600, workers=args.workers, shard=args.shard, seed=args.seed,
+                        sensor_period=args.sensor_period, motion_period=args.motion_period,
+                        occupancy=args.occupancy, layout=args.layout, vectorized=args.vectorized,
+                        rooms=args.rooms)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.homes} casas, {args.hours:g} h simuladas cada, em {elapsed:.1f} s")
+    for name, stats in summarize(results).items():
+        print(f"{name:13s} total={stats['total']:14.2f}  média={stats['mean']:10.3f}  "
+              f"p50={stats['p50']:10.3f}  p95={stats['p95']:10.3f}")
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8") as f:
+            f.write("home," + ",".join(STATS) + "\n")
+            for home_id in range(args.homes):
+                row = results[home_id * NSTATS:(home_id + 1) * NSTATS]
+                f.write(f"{home_id}," + ",".join(f"{v:g}" for v in row) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Renderizador da planta baixa em modo retido: guarda o último estado desenhado de
+# cada item do canvas e só chama o Tk para itens cujo estado realmente mudou.
+from metrics import METRICS
+
+ITEMCONFIG_CALLS = METRICS.counter("itemconfig_calls_total", "Chamadas de itemconfig feitas pelo renderizador")
+
+LIGHT_ON = "light_on"
+LIGHT_OFF = "light_off"
+AC_ON = "ac_on"
+AC_OFF = "ac_off"
+
+# Estilos pré-calculados: nome -> opções passadas ao itemconfig
+STYLES = {
+    LIGHT_ON: {"fill": "#ffc107"},
+    LIGHT_OFF: {"fill": "#6c757d"},
+    AC_ON: {"fill": "#0dcaf0"},
+    AC_OFF: {"fill": "#6c757d"},
+}
+
+
+def light_style(on):
+    return LIGHT_ON if on else LIGHT_OFF
+
+
+def ac_style(on):
+    return AC_ON if on else AC_OFF
+
+
+class FloorPlanRenderer:
+    __slots__ = ("canvas", "_items", "_drawn", "itemconfig_calls")
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        # chave -> ID do item no canvas, ex.: ("bedroom", "light") -> 12
+        self._items = {}
+        # chave -> nome do estilo desenhado por último
+        self._drawn = {}
+        self.itemconfig_calls = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    # Cria um oval ou retângulo dinâmico já com o estilo inicial
+    def create_oval(self, key, coords, style):
+        item_id = self.canvas.create_oval(*coords, outline="", **STYLES[style])
+        self._register(key, item_id, style)
+        return item_id
+
+    def create_rectangle(self, key, coords, style):
+        item_id = self.canvas.create_rectangle(*coords, outline="", **STYLES[style])
+        self._register(key, item_id, style)
+        return item_id
+
+    def _register(self, key, item_id, style):
+        self._items[key] = item_id
+        self._drawn[key] = style
+
+    def item_id(self, key):
+        return self._items.get(key)
+
+    # Reconcilia os ícones de luz e AC de um cômodo com o estado do núcleo
+    def update_room(self, room):
+        self.set_style((room.key, "light"), light_style(room.light_on))
+        if room.has_ac:
+            self.set_style((room.key, "ac"), ac_style(room.ac_on))
+
+    # Só emite itemconfig quando o estilo difere do último desenhado
+    def set_style(self, key, style):
+        if self._drawn.get(key) == style:
+            return False
+        item_id = self._items.get(key)
+        if item_id is None:
+            return False
+        self.canvas.itemconfig(item_id, **STYLES[style])
+        self._drawn[key] = style
+        self.itemconfig_calls += 1
+        if METRICS.enabled:
+            ITEMCONFIG_CALLS.inc()
+        return True
+
+
+# Camada estática da planta: cômodos, rótulos, portas, janelas e móveis
+def draw_static_layer(canvas, layout):
+    wall_color = layout.wall_color
+    for room in layout.rooms:
+        canvas.create_rectangle(*room.rect, fill=room.fill, outline=wall_color, width=2, tags=("room", room.key))
+        canvas.create_text(*room.label_pos, text=room.label, font=("Segoe UI", 14, "bold"), fill=room.text_color)
+
+    for door in layout.doors:
+        canvas.create_line(*door, fill=wall_color, width=4)
+    for window in layout.windows:
+        canvas.create_rectangle(*window, fill="#0d6efd", outline="#0d6efd")
+
+    for item in layout.furniture:
+        create = canvas.create_oval if item["shape"] == "oval" else canvas.create_rectangle
+        create(*item["coords"], fill=item["fill"], outline=item["outline"], width=item.get("width", 1))
+        if "text" in item:
+            canvas.create_text(*item["text_pos"], text=item["text"], fill="white",
+                               font=("Segoe UI", item.get("font_size", 10), "bold"))
+
+
+# Ícones dinâmicos de cada cômodo: luz (círculo) e, se houver, AC (retângulo abaixo)
+def create_room_icons(renderer, layout, home):
+    for room_layout in layout.rooms:
+        room = home.rooms[room_layout.key]
+        x, y = room_layout.icon
+        renderer.create_oval((room.key, "light"), (x-10, y-10, x+10, y+10), light_style(room.light_on))
+        if room.has_ac:
+            renderer.create_rectangle((room.key, "ac"), (x-10, y+15, x+10, y+35), ac_style(room.ac_on))
@@ -0,0 +1,168 @@
+# Histórico circular dos sensores: memória fixa em array('d'), append O(1) e consultas
+# por janela de tempo. Com NumPy instalado as consultas são vetorizadas sobre visões do
+# próprio buffer (sem cópia); sem NumPy usa as funções embutidas sobre fatias do array.
+import math
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Duas semanas de leituras a cada 2 s
+DEFAULT_CAPACITY = 14 * 24 * 60 * 60 // 2
+
+
+class RingBuffer:
+    __slots__ = ("capacity", "_times", "_values", "_next", "_count")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        i = self._next
+        self._times[i] = timestamp
+        self._values[i] = value
+        i += 1
+        self._next = 0 if i == self.capacity else i
+        if self._count < self.capacity:
+            self._count += 1
+
+    def last(self):
+        if not self._count:
+            return None
+        i = self._next - 1
+        return self._times[i], self._values[i]
+
+    # Índice físico do i-ésimo elemento em ordem cronológica
+    def _physical(self, i):
+        start = self._next - self._count
+        return (start + i) % self.capacity
+
+    # Primeira posição lógica com timestamp >= since (busca binária, O(log n))
+    def _bisect(self, since):
+        lo, hi = 0, self._count
+        times = self._times
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[self._physical(mid)] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # Fatias contíguas (no máximo duas) do buffer cobrindo a janela pedida
+    def _segments(self, buffer, since=None):
+        first = self._bisect(since) if since is not None else 0
+        n = self._count - first
+        if n <= 0:
+            return []
+        start = self._physical(first)
+        end = start + n
+        if np is not None:
+            view = np.frombuffer(buffer, dtype=np.float64)
+            if end <= self.capacity:
+                return [view[start:end]]
+            return [view[start:], view[:end - self.capacity]]
+        if end <= self.capacity:
+            return [buffer[start:end]]
+        return [buffer[start:], buffer[:end - self.capacity]]
+
+    def values(self, since=None):
+        segments = self._segments(self._values, since)
+        if np is not None:
+            return np.concatenate(segments) if segments else np.empty(0)
+        out = array("d")
+        for segment in segments:
+            out.extend(segment)
+        return out
+
+    def times(self, since=None):
+        segments = self._segments(self._times, since)
+        if np is not None:
+            return np.concatenate(segments) if segments else np.empty(0)
+        out = array("d")
+        for segment in segments:
+            out.extend(segment)
+        return out
+
+    # Mínimo, máximo e média da janela; None se não houver leituras
+    def stats(self, since=None):
+        segments = self._segments(self._values, since)
+        if not segments:
+            return None
+        n = sum(len(segment) for segment in segments)
+        if np is not None:
+            return (min(float(s.min()) for s in segments),
+                    max(float(s.max()) for s in segments),
+                    sum(float(s.sum()) for s in segments) / n)
+        return (min(min(s) for s in segments),
+                max(max(s) for s in segments),
+                math.fsum(math.fsum(s) for s in segments) / n)
+
+    # Percentil q (0-100) com interpolação linear, como numpy.percentile
+    def percentile(self, q, since=None):
+        values = self.values(since)
+        if not len(values):
+            return None
+        if np is not None:
+            return float(np.percentile(values, q))
+        ordered = sorted(values)
+        pos = (len(ordered) - 1) * q / 100
+        lo = int(pos)
+        hi = min(lo + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+    # Série reduzida a no máximo `points` médias por balde, para desenhar sparklines
+    def downsample(self, points, since=None):
+        values = self.values(since)
+        n = len(values)
+        if n == 0 or points <= 0:
+            return []
+        if n <= points:
+            return [float(v) for v in values]
+        if np is not None:
+            edges = np.linspace(0, n, points + 1).astype(np.int64)
+            sums = np.add.reduceat(values, edges[:-1])
+            return (sums / np.diff(edges)).tolist()
+        out = []
+        for b in range(points):
+            lo = b * n // points
+            hi = (b + 1) * n // points
+            out.append(math.fsum(values[lo:hi]) / (hi - lo))
+        return out
+
+
+# Registra no histórico cada leitura de temperatura e umidade publicada pelo núcleo
+class SensorHistory:
+    __slots__ = ("buffers", "capacity", "clock")
+
+    FIELDS = ("temperature", "humidity")
+
+    def __init__(self, home, capacity=DEFAULT_CAPACITY, clock=time.time):
+        self.capacity = capacity
+        self.clock = clock
+        # (room_key, field) -> RingBuffer; room_key None para os sensores gerais da casa
+        self.buffers = {}
+        for field in self.FIELDS:
+            self.buffer(None, field).append(clock(), getattr(home, field))
+        home.add_listener(self.on_change)
+
+    def buffer(self, room_key, field):
+        key = (room_key, field)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = RingBuffer(self.capacity)
+        return buffer
+
+    def on_change(self, room_key, field, value):
+        if field in self.FIELDS:
+            self.buffer(room_key, field).append(self.clock(), value)
@@ -0,0 +1,205 @@
+# Núcleo da casa inteligente: estado puro em Python, sem dependência do Tkinter.
+# A interface gráfica (smart_home.py) é apenas uma visão sobre este modelo.
+from collections import deque
+
+MANUAL = "Manual"
+AUTOMATIC = "Automático"
+
+# Temperatura acima da qual o ar condicionado é ligado no modo automático
+AC_THRESHOLD = 28
+
+
+class Room:
+    __slots__ = ("key", "label", "has_ac", "ac_presence", "light_on", "ac_on", "motion")
+
+    def __init__(self, key, label, has_ac=False, ac_presence=False):
+        self.key = key
+        self.label = label
+        self.has_ac = has_ac
+        # AC só liga com presença (luz do cômodo acesa), como no Quarto
+        self.ac_presence = ac_presence
+        self.light_on = False
+        self.ac_on = False
+        self.motion = False
+
+
+def default_rooms():
+    return [
+        Room("livingroom", "Sala de Estar", has_ac=True),
+        Room("kitchen", "Cozinha"),
+        Room("bedroom", "Quarto", has_ac=True, ac_presence=True),
+        Room("bathroom", "Banheiro"),
+    ]
+
+
+class HomeState:
+    __slots__ = ("rooms", "ac_rooms", "motion_panel_rooms", "temperature", "humidity", "motion", "mode",
+                 "_listeners", "_pending", "_dispatching")
+
+    def __init__(self, rooms=None, motion_panel_rooms=("livingroom", "bedroom")):
+        if rooms is None:
+            rooms = default_rooms()
+        self.rooms = {room.key: room for room in rooms}
+        self.ac_rooms = [room.key for room in rooms if room.has_ac]
+        # Cômodos cobertos pelo sensor de movimento do painel de controles
+        self.motion_panel_rooms = [key for key in motion_panel_rooms if key in self.rooms]
+
+        # Sensores da casa
+        self.temperature = 25.0
+        self.humidity = 50.0
+        self.motion = False
+
+        # Modo de operação
+        self.mode = MANUAL
+
+        # Funções chamadas a cada mudança de estado: listener(room_key, field, value)
+        # room_key é None para o estado geral da casa (temperatura, umidade, movimento, modo)
+        self._listeners = []
+        # Mudanças feitas por um listener durante a notificação são enfileiradas, para
+        # que todos os listeners vejam os eventos na ordem em que aconteceram
+        self._pending = deque()
+        self._dispatching = False
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, room_key, field, value):
+        self._pending.append((room_key, field, value))
+        if self._dispatching:
+            return
+        self._dispatching = True
+        try:
+            while self._pending:
+                event = self._pending.popleft()
+                for listener in self._listeners:
+                    listener(*event)
+        except BaseException:
+            self._pending.clear()
+            raise
+        finally:
+            self._dispatching = False
+
+    # --- Sensores -------------------------------------------------------
+
+    def set_temperature(self, value):
+        if value != self.temperature:
+            self.temperature = value
+            self._notify(None, "temperature", value)
+
+    def set_humidity(self, value):
+        if value != self.humidity:
+            self.humidity = value
+            self._notify(None, "humidity", value)
+
+    def set_motion(self, value):
+        if value != self.motion:
+            self.motion = value
+            self._notify(None, "motion", value)
+
+    def set_room_motion(self, room_key, value):
+        room = self.rooms[room_key]
+        if value != room.motion:
+            room.motion = value
+            self._notify(room_key, "motion", value)
+
+    # --- Atuadores ------------------------------------------------------
+
+    def set_light(self, room_key, on):
+        room = self.rooms[room_key]
+        if on != room.light_on:
+            room.light_on = on
+            self._notify(room_key, "light", on)
+
+    def set_ac(self, room_key, on):
+        room = self.rooms[room_key]
+        if not room.has_ac:
+            return
+        if on != room.ac_on:
+            room.ac_on = on
+            self._notify(room_key, "ac", on)
+
+    # Comando manual de um atuador (checkbuttons, API de controle). Como na interface,
+    # os controles manuais só valem no modo Manual; retorna False se o comando foi recusado
+    def command(self, room_key, device, on):
+        if self.mode != MANUAL:
+            return False
+        room = self.rooms.get(room_key)
+        if room is None:
+            return False
+        if device == "light":
+            self.set_light(room_key, on)
+        elif device == "ac" and room.has_ac:
+            self.set_ac(room_key, on)
+        else:
+            return False
+        return True
+
+    # Estado completo em tipos simples (JSON)
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "temperature": self.temperature,
+            "humidity": self.humidity,
+            "motion": self.motion,
+            "rooms": {
+                room.key: {
+                    "label": room.label,
+                    "light": room.light_on,
+                    "ac": room.ac_on if room.has_ac else None,
+                    "motion": room.motion,
+                }
+                for room in self.rooms.values()
+            },
+        }
+
+    # --- Modo de operação -----------------------------------------------
+
+    def is_automatic(self):
+        return self.mode == AUTOMATIC
+
+    def set_mode(self, mode):
+        if mode not in (MANUAL, AUTOMATIC):
+            raise ValueError(f"modo desconhecido: {mode!r}")
+        if mode == self.mode:
+            return
+        self.mode = mode
+        self._notify(None, "mode", mode)
+        # Ao voltar para o modo Manual os atuadores são redefinidos
+        if mode == MANUAL:
+            self.reset_actuators()
+
+    # --- Políticas de controle ------------------------------------------
+    # As regras do modo automático (luz por presença, AC por temperatura) ficam no
+    # motor de regras (rules.py); aqui só há eventos de sensor e a redefinição manual.
+
+    # Redefinir todos os atuadores para desligado (apenas no modo Manual)
+    def reset_actuators(self):
+        if self.mode != MANUAL:
+            return
+        for room in self.rooms.values():
+            self.set_light(room.key, False)
+            self.set_ac(room.key, False)
+
+    # Movimento detectado dentro de um cômodo (hover na planta baixa)
+    def motion_enter(self, room_key):
+        self.set_room_motion(room_key, True)
+        self.set_motion(True)
+
+    def motion_leave(self, room_key):
+        self.set_room_motion(room_key, False)
+        self.set_motion(False)
+
+    # Sensor de movimento do painel: cobre os cômodos de motion_panel_rooms
+    # (Sala de Estar e Quarto na planta padrão)
+    def motion_detected(self):
+        for room_key in self.motion_panel_rooms:
+            self.set_room_motion(room_key, True)
+        self.set_motion(True)
+
+    def motion_cleared(self):
+        for room_key in self.motion_panel_rooms:
+            self.set_room_motion(room_key, False)
+        self.set_motion(False)
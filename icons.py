@@ -0,0 +1,44 @@
+# Ícones da interface carregados sob demanda: cada imagem só é decodificada quando um
+# widget pede por ela, e fica em cache nome -> PhotoImage. Sem os arquivos, get devolve
+# None e a interface usa rótulos de texto.
+import os
+
+ICON_FILES = {
+    "temperature": "temperature1.png",
+    "humidity": "humidity1.png",
+    "motion": "motion1.png",
+    "light": "light1.png",
+    "ac": "ac1.png",
+}
+
+
+class IconCache:
+    __slots__ = ("master", "directory", "_images", "_warned")
+
+    def __init__(self, master=None, directory=""):
+        self.master = master
+        # Diretório dos arquivos; vazio = diretório atual, como antes
+        self.directory = directory
+        self._images = {}
+        self._warned = False
+
+    # PhotoImage do ícone `name` (decodificado na primeira vez)
+    def get(self, name):
+        try:
+            return self._images[name]
+        except KeyError:
+            pass
+        image = self._images[name] = self._decode(name)
+        return image
+
+    def _decode(self, name):
+        import tkinter as tk
+
+        path = os.path.join(self.directory, ICON_FILES[name])
+        try:
+            return tk.PhotoImage(master=self.master, file=path)
+        except tk.TclError:
+            if not self._warned:
+                print("Erro ao carregar imagens. Usando rótulos de texto em vez disso.")
+                self._warned = True
+            return None
@@ -0,0 +1,150 @@
+# Planta baixa declarativa: geometria dos cômodos, móveis e ícones carregada de um
+# arquivo JSON, mais um índice espacial em grade que resolve um ponto para o seu cômodo.
+import json
+import os
+
+from home_core import Room
+
+DEFAULT_LAYOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts", "casa.json")
+
+# Tamanho padrão da célula do índice espacial, em pixels do canvas
+GRID_CELL = 64
+
+
+class RoomLayout:
+    __slots__ = ("key", "label", "preposition", "rect", "fill", "text_color", "label_pos",
+                 "icon", "has_ac", "ac_presence")
+
+    def __init__(self, key, label, rect, preposition="do", fill="#e9ecef", text_color="#212529",
+                 label_pos=None, icon=None, has_ac=False, ac_presence=False):
+        self.key = key
+        self.label = label
+        self.preposition = preposition
+        self.rect = tuple(rect)
+        self.fill = fill
+        self.text_color = text_color
+        x1, y1, x2, y2 = self.rect
+        self.label_pos = tuple(label_pos) if label_pos else ((x1 + x2) / 2, (y1 + y2) / 2)
+        self.icon = tuple(icon) if icon else (x1 + 20, y1 + 20)
+        self.has_ac = has_ac
+        self.ac_presence = ac_presence
+
+    def contains(self, x, y):
+        x1, y1, x2, y2 = self.rect
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+
+class Layout:
+    __slots__ = ("name", "size", "wall_color", "rooms", "doors", "windows", "furniture",
+                 "sensor_icons", "motion_panel_rooms", "sparkline", "index")
+
+    def __init__(self, rooms, name="Casa", size=(400, 500), wall_color="#666", doors=(), windows=(),
+                 furniture=(), sensor_icons=None, motion_panel_rooms=(), sparkline=None):
+        self.name = name
+        self.size = tuple(size)
+        self.wall_color = wall_color
+        self.rooms = list(rooms)
+        self.doors = [tuple(d) for d in doors]
+        self.windows = [tuple(w) for w in windows]
+        self.furniture = list(furniture)
+        self.sensor_icons = dict(sensor_icons or {})
+        self.motion_panel_rooms = list(motion_panel_rooms)
+        # Retângulo (x1, y1, x2, y2) do gráfico de histórico da temperatura, se houver
+        self.sparkline = tuple(sparkline) if sparkline else None
+        self.index = SpatialIndex(self.rooms)
+
+    # Cômodos do núcleo (home_core.Room) correspondentes a esta planta
+    def make_rooms(self):
+        return [Room(r.key, r.label, has_ac=r.has_ac, ac_presence=r.ac_presence) for r in self.rooms]
+
+    def room_at(self, x, y):
+        return self.index.locate(x, y)
+
+
+def load_layout(path=DEFAULT_LAYOUT):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    rooms = [RoomLayout(**room) for room in data.pop("rooms")]
+    return Layout(rooms, **data)
+
+
+# Gera uma planta em grade com n cômodos, útil para simular prédios grandes
+def generate_layout(n_rooms, room_size=(120, 100), gap=10, ac_every=2):
+    width, height = room_size
+    cols = max(1, int(n_rooms ** 0.5))
+    rooms = []
+    for i in range(n_rooms):
+        row, col = divmod(i, cols)
+        x1 = gap + col * (width + gap)
+        y1 = gap + row * (height + gap)
+        rooms.append(RoomLayout(
+            key=f"room{i}",
+            label=f"Cômodo {i}",
+            rect=(x1, y1, x1 + width, y1 + height),
+            has_ac=(i % ac_every == 0),
+            ac_presence=True,
+        ))
+    rows = (n_rooms + cols - 1) // cols
+    size = (gap + cols * (width + gap), gap + rows * (height + gap))
+    return Layout(rooms, name=f"Grade {n_rooms}", size=size)
+
+
+# Índice espacial em grade uniforme: cada célula guarda os cômodos que a tocam,
+# então localizar um ponto custa O(1) em média, independente do número de cômodos.
+class SpatialIndex:
+    __slots__ = ("cell", "_cells")
+
+    def __init__(self, rooms, cell=GRID_CELL):
+        self.cell = cell
+        self._cells = {}
+        for room in rooms:
+            self.insert(room)
+
+    def insert(self, room):
+        cell = self.cell
+        x1, y1, x2, y2 = room.rect
+        for cx in range(int(min(x1, x2) // cell), int(max(x1, x2) // cell) + 1):
+            for cy in range(int(min(y1, y2) // cell), int(max(y1, y2) // cell) + 1):
+                self._cells.setdefault((cx, cy), []).append(room)
+
+    def locate(self, x, y):
+        candidates = self._cells.get((int(x // self.cell), int(y // self.cell)))
+        if candidates:
+            for room in candidates:
+                if room.contains(x, y):
+                    return room.key
+        return None
+
+
+# Resolve posições de um ocupante (mouse no canvas ou um feed simulado) para eventos
+# de entrada e saída de cômodos no núcleo.
+class MotionTracker:
+    __slots__ = ("home", "layout", "current")
+
+    def __init__(self, home, layout):
+        self.home = home
+        self.layout = layout
+        self.current = None
+
+    def move_to(self, x, y):
+        room_key = self.layout.index.locate(x, y)
+        if room_key == self.current:
+            return
+        if self.current is not None:
+            self.home.motion_leave(self.current)
+        self.current = room_key
+        if room_key is not None:
+            self.home.motion_enter(room_key)
+
+    def leave(self):
+        if self.current is not None:
+            self.home.motion_leave(self.current)
+            self.current = None
+
+    # Reproduz um feed de posições (x, y); None significa que o ocupante saiu da planta
+    def feed(self, points):
+        for point in points:
+            if point is None:
+                self.leave()
+            else:
+                self.move_to(*point)
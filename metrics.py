@@ -0,0 +1,233 @@
+# Contadores e histogramas de latência dos caminhos quentes (regras, fila da interface,
+# renderização, sensor -> atuador). Desligados por padrão: cada ponto de medição só
+# testa METRICS.enabled. Ligados, os contadores (chamadas de itemconfig, mensagens e
+# descartes do barramento) e os histogramas são atualizados no próprio caminho quente;
+# só a profundidade da fila da interface é lida na coleta (Gauge.set_function).
+# Exportados no formato texto do Prometheus em uma porta local:
+#
+#   GET  /metrics     métricas atuais
+#   POST /enable      liga a medição
+#   POST /disable     desliga a medição
+import asyncio
+import sys
+from bisect import bisect_left
+from time import perf_counter
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9108
+
+PREFIX = "casa_"
+
+# Limites dos buckets, em segundos e em itens
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096)
+
+SENSOR_FIELDS = ("temperature", "humidity", "motion")
+ACTUATOR_FIELDS = ("light", "ac")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    __slots__ = ("name", "help", "_values", "_fn")
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = PREFIX + name
+        self.help = help
+        # labels (tupla de pares) -> valor
+        self._values = {}
+        # Função lida na coleta, para valores mantidos por outro objeto
+        self._fn = None
+
+    def inc(self, amount=1.0, labels=()):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    # fn() devolve um número ou um dict {labels: valor}
+    def set_function(self, fn):
+        self._fn = fn
+
+    def samples(self):
+        values = dict(self._values)
+        if self._fn is not None:
+            value = self._fn()
+            if isinstance(value, dict):
+                values.update(value)
+            elif value is not None:
+                values[()] = value
+        return [(self.name, labels, value) for labels, value in values.items()]
+
+
+class Gauge(Counter):
+    __slots__ = ()
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+
+class Histogram:
+    __slots__ = ("name", "help", "bounds", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, name, help, bounds=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help
+        self.bounds = tuple(bounds)
+        # Um contador por bucket, mais o +Inf
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Estimativa do quantil q (0..1) pelo limite superior do bucket
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        samples = []
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            samples.append((self.name + "_bucket", (("le", f"{bound:g}"),), seen))
+        samples.append((self.name + "_bucket", (("le", "+Inf"),), self.count))
+        samples.append((self.name + "_sum", (), self.sum))
+        samples.append((self.name + "_count", (), self.count))
+        return samples
+
+
+class Registry:
+    __slots__ = ("enabled", "_metrics")
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def _register(self, metric):
+        # Registrar de novo com o mesmo nome devolve a métrica existente
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help):
+        return self._register(Counter(name, help))
+
+    def gauge(self, name, help):
+        return self._register(Gauge(name, help))
+
+    def histogram(self, name, help, bounds=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, bounds))
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    # Grava as métricas em um arquivo ("-" para a saída de erro), ex.: ao encerrar
+    def dump(self, path):
+        text = self.render()
+        if path == "-":
+            sys.stderr.write(text)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+METRICS = Registry()
+
+SENSOR_TO_ACTUATOR = METRICS.histogram(
+    "sensor_to_actuator_seconds", "Tempo entre uma leitura de sensor e a mudança de atuador que ela causou")
+
+
+# Listener do núcleo: marca o instante da última leitura de sensor e mede até a próxima
+# mudança de atuador no modo automático (com polling, inclui a espera pelo laço)
+class SensorActuatorProbe:
+    __slots__ = ("home", "_since")
+
+    def __init__(self, home):
+        self.home = home
+        self._since = None
+        home.add_listener(self.on_change)
+
+    def on_change(self, room_key, field, value):
+        if not METRICS.enabled:
+            return
+        if field in SENSOR_FIELDS:
+            self._since = perf_counter()
+        elif field in ACTUATOR_FIELDS:
+            if self._since is not None and self.home.is_automatic():
+                SENSOR_TO_ACTUATOR.observe(perf_counter() - self._since)
+                self._since = None
+        elif field == "mode":
+            self._since = None
+
+    def stop(self):
+        self.home.remove_listener(self.on_change)
+
+
+class MetricsServer:
+    __slots__ = ("registry", "host", "port", "server")
+
+    def __init__(self, registry=METRICS, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+
+    async def _serve(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            method, path, _ = request_line.decode("latin-1").split()
+            if method == "GET" and path == "/metrics":
+                status, body = "200 OK", self.registry.render()
+            elif method == "POST" and path in ("/enable", "/disable"):
+                if path == "/enable":
+                    self.registry.enable()
+                else:
+                    self.registry.disable()
+                status, body = "200 OK", f"enabled {int(self.registry.enabled)}\n"
+            else:
+                status, body = "404 Not Found", "rota desconhecida\n"
+            data = body.encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,188 @@
+# Motor de regras do modo automático. As regras são declaradas como dados e
+# compiladas em uma tabela de decisão (uma linha por regra x cômodo), com um índice
+# de cada sensor para as linhas que dependem dele: uma mudança de sensor reavalia
+# somente essas linhas, não importa quantas regras a casa tenha.
+import json
+import operator
+from time import perf_counter
+
+from home_core import AUTOMATIC, AC_THRESHOLD
+from metrics import METRICS
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# Campos do estado geral da casa e dos cômodos -> atributo correspondente
+HOUSE_FIELDS = {"temperature": "temperature", "humidity": "humidity"}
+ROOM_FIELDS = {"motion": "motion", "light": "light_on", "ac": "ac_on"}
+
+# Dispositivos que uma regra pode acionar ("set")
+TARGETS = ("light", "ac")
+
+RULE_SECONDS = METRICS.histogram("rule_evaluation_seconds", "Tempo de reavaliação das regras por mudança de estado")
+RULE_ROWS = METRICS.counter("rule_evaluations_total", "Linhas da tabela de regras avaliadas")
+
+DEFAULT_RULES = [
+    # Movimento em um cômodo acende a luz dele
+    {"name": "luz_presenca", "rooms": "*",
+     "when": [["motion", "==", True]],
+     "set": "light", "then": True, "else": False},
+    # AC liga quando a temperatura passa do limite
+    {"name": "ac_calor", "rooms": {"has_ac": True, "ac_presence": False},
+     "when": [["temperature", ">", AC_THRESHOLD]],
+     "set": "ac", "then": True, "else": False},
+    # Nos cômodos com ac_presence, somente se a luz estiver ligada (presença)
+    {"name": "ac_calor_presenca", "rooms": {"has_ac": True, "ac_presence": True},
+     "when": [["temperature", ">", AC_THRESHOLD], ["light", "==", True]],
+     "set": "ac", "then": True, "else": False},
+]
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Confere uma regra antes de compilá-la: um alvo, campo ou operador desconhecido vira
+# erro com o nome da regra, em vez de acionar o dispositivo errado ou falhar no meio
+def validate_rule(rule):
+    if "name" not in rule:
+        raise ValueError(f"regra sem 'name': {rule!r}")
+    name = rule["name"]
+    target = rule.get("set")
+    if target not in TARGETS:
+        raise ValueError(f"regra {name!r}: alvo desconhecido em 'set': {target!r}")
+    if not isinstance(rule.get("when"), list):
+        raise ValueError(f"regra {name!r}: 'when' deve ser uma lista de condições")
+    for condition in rule["when"]:
+        if len(condition) != 3:
+            raise ValueError(f"regra {name!r}: condição deve ser [campo, operador, valor]: {condition!r}")
+        field, op, value = condition
+        if field not in HOUSE_FIELDS and field not in ROOM_FIELDS:
+            raise ValueError(f"regra {name!r}: campo desconhecido em 'when': {field!r}")
+        if op not in OPERATORS:
+            raise ValueError(f"regra {name!r}: operador desconhecido em 'when': {op!r}")
+
+
+def _select_rooms(home, selector):
+    if selector == "*":
+        return list(home.rooms.values())
+    if isinstance(selector, dict):
+        return [room for room in home.rooms.values()
+                if all(getattr(room, attr) == value for attr, value in selector.items())]
+    return [home.rooms[key] for key in selector if key in home.rooms]
+
+
+class RuleEngine:
+    __slots__ = ("home", "names", "_conditions", "_actions", "_index", "firings", "evaluations", "reactive")
+
+    def __init__(self, home, rules=DEFAULT_RULES, reactive=True):
+        self.home = home
+        self.reactive = reactive
+        # Tabela de decisão em colunas: nome da regra, condições e ação de cada linha
+        self.names = []
+        self._conditions = []
+        self._actions = []
+        # (room_key, field) -> índices das linhas que dependem desse sensor
+        self._index = {}
+        # Quantas vezes cada regra teve a condição satisfeita
+        self.firings = {}
+        self.evaluations = 0
+        for rule in rules:
+            self.add_rule(rule)
+        if reactive:
+            home.add_listener(self.on_change)
+        # Estado inicial já avaliado, como faria a primeira volta do laço de polling
+        self.evaluate_all()
+
+    # Compila uma regra declarativa em uma linha da tabela por cômodo selecionado
+    def add_rule(self, rule):
+        validate_rule(rule)
+        home = self.home
+        name = rule["name"]
+        self.firings.setdefault(name, 0)
+        target = rule["set"]
+        setter = home.set_light if target == "light" else home.set_ac
+        for room in _select_rooms(home, rule.get("rooms", "*")):
+            if target == "ac" and not room.has_ac:
+                continue
+            conditions = []
+            deps = []
+            for field, op, value in rule["when"]:
+                if field in HOUSE_FIELDS:
+                    conditions.append((home, HOUSE_FIELDS[field], OPERATORS[op], value))
+                    deps.append((None, field))
+                else:
+                    conditions.append((room, ROOM_FIELDS[field], OPERATORS[op], value))
+                    deps.append((room.key, field))
+            row = len(self.names)
+            self.names.append(name)
+            self._conditions.append(tuple(conditions))
+            self._actions.append((setter, room.key, rule.get("then"), rule.get("else")))
+            # A linha é nova, então só pode se repetir dentro das próprias dependências (o
+            # mesmo sensor em duas condições): dict.fromkeys remove a repetição sem varrer
+            # as listas do índice, que para sensores da casa têm uma linha por cômodo
+            for dep in dict.fromkeys(deps):
+                self._index.setdefault(dep, []).append(row)
+            if self.reactive and home.mode == AUTOMATIC:
+                self.evaluate(row)
+
+    def __len__(self):
+        return len(self.names)
+
+    def evaluate(self, row):
+        self.evaluations += 1
+        for obj, attr, op, value in self._conditions[row]:
+            if not op(getattr(obj, attr), value):
+                matched = False
+                break
+        else:
+            matched = True
+        setter, room_key, then_value, else_value = self._actions[row]
+        if matched:
+            self.firings[self.names[row]] += 1
+            if then_value is not None:
+                setter(room_key, then_value)
+        elif else_value is not None:
+            setter(room_key, else_value)
+
+    # Avalia a tabela inteira (entrada no modo automático ou laço de polling)
+    def evaluate_all(self):
+        if self.home.mode != AUTOMATIC:
+            return
+        if METRICS.enabled:
+            start = perf_counter()
+            self._evaluate_rows(range(len(self.names)))
+            RULE_SECONDS.observe(perf_counter() - start)
+        else:
+            self._evaluate_rows(range(len(self.names)))
+
+    def _evaluate_rows(self, rows):
+        for row in rows:
+            self.evaluate(row)
+        if METRICS.enabled:
+            RULE_ROWS.inc(len(rows))
+
+    # Listener do núcleo: só as linhas indexadas pelo sensor alterado são reavaliadas
+    def on_change(self, room_key, field, value):
+        if field == "mode":
+            self.evaluate_all()
+            return
+        rows = self._index.get((room_key, field))
+        if rows and self.home.mode == AUTOMATIC:
+            if METRICS.enabled:
+                start = perf_counter()
+                self._evaluate_rows(rows)
+                RULE_SECONDS.observe(perf_counter() - start)
+            else:
+                self._evaluate_rows(rows)
+
+    def stop(self):
+        if self.reactive:
+            self.home.remove_listener(self.on_change)
@@ -0,0 +1,388 @@
+# Runtime asyncio da casa: sensores simulados, regras de controle e E/S rodam como
+# corrotinas em um único event loop, cada dispositivo com seu próprio período.
+# Pode rodar sem interface (asyncio.run) ou embutido no laço principal do Tk.
+# Os sensores publicam as leituras no barramento de dispositivos (bus.py), que as
+# aplica no núcleo e publica de volta as mudanças de estado para os consumidores.
+import argparse
+import asyncio
+import heapq
+import math
+import random
+import selectors
+import time
+import zlib
+
+from home_core import HomeState, AUTOMATIC
+from rules import RuleEngine, DEFAULT_RULES, load_rules
+from clock import WallClock, VirtualClock
+from bus import DeviceBus, HomeBridge
+from metrics import METRICS, SensorActuatorProbe, SENSOR_TO_ACTUATOR
+from energy import EnergyMeter, format_usage
+
+SENSOR_PERIOD = 2.0
+CONTROL_PERIOD = 0.5
+
+# Espera máxima do Tk entre duas voltas no event loop do asyncio quando nada está
+# pendente, e intervalo de consulta quando o loop não avisa de trabalho novo
+TK_IDLE_MS = 1000
+TK_STEP_MS = 5
+
+# tkinter.READABLE, sem importar o Tkinter no modo sem interface
+READABLE = 2
+
+
+class HomeRuntime:
+    __slots__ = ("home", "control", "rules", "clock", "seed", "rng", "bus", "bridge", "engine", "probe", "loop",
+                 "stagger", "_periodic", "_tasks", "ticks")
+
+    def __init__(self, home, control="reactive", clock=None, seed=None, rng=None, rules=DEFAULT_RULES, bus=None,
+                 stagger=0.0):
+        self.home = home
+        self.control = control
+        self.rules = rules
+        self.clock = clock if clock is not None else WallClock()
+        # Com semente, cada dispositivo tem o seu gerador, semeado por (semente, nome do
+        # dispositivo): a sequência de leituras de um sensor não depende da ordem em que
+        # os timers de outros dispositivos (ou de outras casas no mesmo loop) disparam.
+        # Sem semente, ou com `rng`, todos os dispositivos compartilham um gerador.
+        self.seed = seed
+        self.rng = rng
+        self.bus = bus if bus is not None else DeviceBus()
+        self.bridge = HomeBridge(home, self.bus)
+        self.engine = None
+        self.probe = None
+        self.loop = None
+        # Defasagem entre produtores (s): o i-ésimo começa i * stagger depois do
+        # primeiro, então timers da mesma casa nunca empatam e a ordem em que disparam
+        # não depende de quantas outras casas dividem o loop
+        self.stagger = stagger
+        # (nome, período, função) de cada produtor periódico
+        self._periodic = []
+        self._tasks = []
+        # Quantas vezes cada produtor já rodou (nome -> contagem)
+        self.ticks = {}
+
+    # Registra uma função chamada a cada `period` segundos; retorna o próprio runtime
+    def every(self, name, period, fn):
+        self._periodic.append((name, period, fn))
+        self.ticks[name] = 0
+        if self.loop is not None:
+            delay = (len(self._periodic) - 1) * self.stagger
+            self._tasks.append(self.loop.create_task(self._run_every(name, period, fn, delay)))
+        return self
+
+    def device_rng(self, name):
+        if self.rng is None:
+            if self.seed is not None:
+                return random.Random(f"{self.seed}:{name}")
+            self.rng = random.Random()
+        return self.rng
+
+    # Sensores padrão da casa: temperatura e umidade aleatórias a cada 2 s
+    def add_house_sensors(self, period=SENSOR_PERIOD, on_update=None):
+        rng = self.device_rng("sensors")
+        publish = self.bus.publish
+
+        def update_sensors():
+            publish("sensors/temperature", round(rng.uniform(18, 35), 1))
+            publish("sensors/humidity", round(rng.uniform(30, 70), 1))
+            if on_update:
+                on_update()
+
+        return self.every("sensors", period, update_sensors)
+
+    # Sensor de presença simulado para um cômodo: entra e sai aleatoriamente
+    def add_motion_sensor(self, room_key, period, probability=0.5):
+        rng = self.device_rng(f"motion:{room_key}")
+        publish = self.bus.publish
+        topic = f"sensors/{room_key}/motion"
+
+        def update_motion():
+            publish(topic, rng.random() < probability)
+
+        return self.every(f"motion:{room_key}", period, update_motion)
+
+    # Agenda as corrotinas no loop; no modo reativo não há laço de controle
+    def start(self, loop=None):
+        loop = loop if loop is not None else asyncio.get_running_loop()
+        reactive = self.control == "reactive"
+        self.engine = RuleEngine(self.home, self.rules, reactive=reactive)
+        self.probe = SensorActuatorProbe(self.home)
+        if not reactive:
+            self.every("control", CONTROL_PERIOD, self.engine.evaluate_all)
+        self.loop = loop
+        self.bus.start(loop)
+        for index, (name, period, fn) in enumerate(self._periodic):
+            self._tasks.append(loop.create_task(self._run_every(name, period, fn, index * self.stagger)))
+        return self
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.bus.stop()
+        if self.engine:
+            self.engine.stop()
+        if self.probe:
+            self.probe.stop()
+
+    # Agendamento sem deriva: o n-ésimo disparo acontece em início + n * período
+    async def _run_every(self, name, period, fn, delay=0.0):
+        loop = self.loop
+        ticks = self.ticks
+        next_time = loop.time() + delay
+        if delay:
+            await asyncio.sleep(delay)
+        while True:
+            fn()
+            ticks[name] += 1
+            next_time += period
+            await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+    # Modo sem interface: roda por `duration` segundos (ou até ser cancelado)
+    async def run(self, duration=None):
+        self.start()
+        try:
+            if duration is None:
+                await asyncio.gather(*self._tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            self.stop()
+
+
+# Event loop que avisa quando ganha trabalho fora de uma volta (um callback pronto ou
+# um timer novo), para a ponte com o Tk acordar na hora certa em vez de consultar o
+# loop a intervalos fixos. O seletor é criado aqui para o Tk poder vigiar o seu descritor.
+# Os prazos dos timers são anotados aqui mesmo, sem ler as filas internas do asyncio;
+# um timer cancelado continua anotado até vencer e só causa uma volta a mais.
+class _TkEventLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self):
+        selector = selectors.DefaultSelector()
+        super().__init__(selector=selector)
+        self.selector = selector
+        # on_schedule(instante do loop): chamado quando há trabalho novo com o loop parado
+        self.on_schedule = None
+        # Há callback agendado com call_soon desde o início da última volta
+        self.has_ready = False
+        # Heap com os instantes dos timers ainda não atendidos por uma volta
+        self.deadlines = []
+
+    def call_soon(self, callback, *args, context=None):
+        handle = super().call_soon(callback, *args, context=context)
+        self.has_ready = True
+        if self.on_schedule is not None and not self.is_running():
+            self.on_schedule(self.time())
+        return handle
+
+    def call_at(self, when, callback, *args, context=None):
+        handle = super().call_at(when, callback, *args, context=context)
+        heapq.heappush(self.deadlines, when)
+        if self.on_schedule is not None and not self.is_running():
+            self.on_schedule(when)
+        return handle
+
+    # Início de uma volta: ela executa o que já está pronto e todo timer vencido até
+    # `now`, então esses prazos saem da lista
+    def begin_step(self, now):
+        self.has_ready = False
+        deadlines = self.deadlines
+        while deadlines and deadlines[0] <= now:
+            heapq.heappop(deadlines)
+
+    # Instante em que o loop volta a ter trabalho, ou None se não houver nada pendente
+    def next_deadline(self):
+        if self.has_ready:
+            return self.time()
+        return self.deadlines[0] if self.deadlines else None
+
+
+# Ponte entre o laço principal do Tk e um event loop asyncio na mesma thread. O Tk
+# processa uma volta do loop quando vence o timer mais próximo, quando o loop ganha
+# um callback pronto e (em Unix) quando há E/S nos sockets do loop; sem nada
+# pendente, a interface ociosa não acorda.
+class TkAsyncBridge:
+    __slots__ = ("root", "loop", "interval_ms", "_after_id", "_deadline", "_stepping", "_watching")
+
+    def __init__(self, root, loop=None, interval_ms=TK_IDLE_MS):
+        self.root = root
+        self.loop = loop if loop is not None else _TkEventLoop()
+        # Espera máxima entre voltas; com um loop externo (sem os avisos acima) é
+        # também o intervalo de consulta
+        self.interval_ms = interval_ms if isinstance(self.loop, _TkEventLoop) else min(interval_ms, TK_STEP_MS)
+        self._after_id = None
+        # Instante do loop em que a próxima volta está agendada
+        self._deadline = None
+        self._stepping = False
+        self._watching = False
+
+    def start(self):
+        asyncio.set_event_loop(self.loop)
+        loop = self.loop
+        if isinstance(loop, _TkEventLoop):
+            loop.on_schedule = self._wake
+            try:
+                self.root.tk.createfilehandler(loop.selector.fileno(), READABLE, self._on_io)
+                self._watching = True
+            except (AttributeError, OSError, NotImplementedError, RuntimeError):
+                # Sem createfilehandler (ex.: Windows) ou seletor sem descritor: a E/S
+                # é atendida nas voltas agendadas, no máximo a cada TK_STEP_MS
+                self.interval_ms = min(self.interval_ms, TK_STEP_MS)
+        self._schedule_next()
+
+    # Agenda a volta para `when` (instante do loop), se for antes da já agendada
+    def _wake(self, when):
+        if self._stepping:
+            return
+        if self._deadline is not None and self._deadline <= when:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        delay_ms = max(0, math.ceil((when - self.loop.time()) * 1000))
+        delay_ms = min(delay_ms, self.interval_ms)
+        self._deadline = self.loop.time() + delay_ms / 1000
+        self._after_id = self.root.after(delay_ms, self._step)
+
+    def _on_io(self, fd, mask):
+        self._wake(self.loop.time())
+
+    # Próxima volta: já, se sobrou callback pronto; senão no timer mais próximo. Um
+    # loop externo não anota prazos e é consultado a cada interval_ms
+    def _schedule_next(self):
+        loop = self.loop
+        when = loop.next_deadline() if isinstance(loop, _TkEventLoop) else None
+        if when is None:
+            when = loop.time() + self.interval_ms / 1000
+        self._wake(when)
+
+    def _step(self):
+        self._after_id = None
+        self._deadline = None
+        loop = self.loop
+        # Executa tudo o que está pronto (incluindo timers vencidos) e volta para o Tk
+        self._stepping = True
+        try:
+            loop.call_soon(loop.stop)
+            if isinstance(loop, _TkEventLoop):
+                loop.begin_step(loop.time())
+            loop.run_forever()
+        finally:
+            self._stepping = False
+        self._schedule_next()
+
+    def stop(self):
+        loop = self.loop
+        if isinstance(loop, _TkEventLoop):
+            loop.on_schedule = None
+        if self._watching:
+            self.root.tk.deletefilehandler(loop.selector.fileno())
+            self._watching = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+            self._deadline = None
+        # Deixa as tarefas canceladas terminarem antes de fechar o loop
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Casa inteligente sem interface gráfica (asyncio)")
+    parser.add_argument("--rooms", type=int, default=0,
+                        help="simula uma planta em grade com este número de cômodos e um sensor de presença em cada")
+    parser.add_argument("--motion-period", type=float, default=1.0, help="período dos sensores de presença (s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="duração da simulação (s)")
+    parser.add_argument("--control", choices=("reactive", "polling"), default="reactive")
+    parser.add_argument("--rules", help="arquivo JSON com as regras do modo automático")
+    parser.add_argument("--seed", type=int, help="semente do gerador aleatório (execuções repetíveis)")
+    parser.add_argument("--api-port", type=int, help="serve a API local de controle (JSON/HTTP) nesta porta")
+    parser.add_argument("--broker", metavar="HOST:PORTA",
+                        help="liga o barramento a um broker local (python bus.py broker) para dispositivos externos")
+    parser.add_argument("--metrics-port", type=int, help="liga as métricas e as serve (Prometheus) nesta porta")
+    parser.add_argument("--metrics-dump", metavar="ARQUIVO",
+                        help="liga as métricas e as grava neste arquivo ao encerrar (- para a saída de erro)")
+    parser.add_argument("--snapshot", metavar="ARQUIVO", help="restaura o estado deste snapshot e o grava ao encerrar")
+    parser.add_argument("--fast-forward", action="store_true",
+                        help="relógio virtual: avança direto para o próximo evento em vez de esperar")
+    args = parser.parse_args()
+
+    if args.rooms:
+        from layout import generate_layout
+        layout = generate_layout(args.rooms)
+        home = HomeState(layout.make_rooms())
+    else:
+        home = HomeState()
+    home.set_mode(AUTOMATIC)
+    if args.snapshot:
+        from snapshot import load_snapshot
+        restored = load_snapshot(args.snapshot)
+        if restored is not None:
+            restored.apply(home)
+
+    changes = 0
+    digest = 0
+
+    # Contagem e assinatura (CRC32) da sequência de mudanças, para comparar execuções
+    def count(room_key, field, value):
+        nonlocal changes, digest
+        changes += 1
+        digest = zlib.crc32(f"{room_key}|{field}|{value}".encode(), digest)
+
+    home.add_listener(count)
+    if args.metrics_port is not None or args.metrics_dump:
+        METRICS.enable()
+    clock = VirtualClock(start=time.time()) if args.fast_forward else WallClock()
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+    runtime = HomeRuntime(home, control=args.control, clock=clock, seed=args.seed, rules=rules)
+    meter = EnergyMeter(home, clock)
+    runtime.add_house_sensors()
+    for i, room_key in enumerate(home.rooms if args.rooms else ()):
+        # Períodos levemente diferentes para que os dispositivos não disparem juntos
+        runtime.add_motion_sensor(room_key, args.motion_period * (1 + (i % 97) / 970))
+
+    async def serve():
+        api = None
+        link = None
+        metrics_server = None
+        if args.metrics_port is not None:
+            from metrics import MetricsServer
+            metrics_server = await MetricsServer(port=args.metrics_port).start()
+        if args.api_port is not None:
+            from api import ControlAPI
+            api = await ControlAPI(home, port=args.api_port, energy=meter).start()
+        if args.broker:
+            from bus import BrokerLink, parse_address
+            link = await BrokerLink(runtime.bus, *parse_address(args.broker)).start()
+        try:
+            await runtime.run(args.duration)
+        finally:
+            if link:
+                link.stop()
+            if api:
+                api.stop()
+            if metrics_server:
+                metrics_server.stop()
+
+    start = time.perf_counter()
+    clock.run(serve())
+    elapsed = time.perf_counter() - start
+    print(f"{len(runtime.ticks)} dispositivos, {sum(runtime.ticks.values())} leituras, "
+          f"{changes} mudanças de estado ({args.duration:.0f} s simulados) em {elapsed:.1f} s; "
+          f"assinatura {digest:08x}")
+    print(f"{len(runtime.engine)} linhas na tabela de regras, {runtime.engine.evaluations} avaliações; "
+          f"disparos: {runtime.engine.firings}")
+    if args.snapshot:
+        from snapshot import save_snapshot
+        save_snapshot(args.snapshot, home, clock=clock.now)
+    print(f"consumo: {meter.energy_kwh():.3f} kWh ({meter.transitions} transições); {format_usage(meter)}")
+    if SENSOR_TO_ACTUATOR.count:
+        print(f"sensor -> atuador: p50 {SENSOR_TO_ACTUATOR.quantile(0.5) * 1e6:g} µs, "
+              f"p99 {SENSOR_TO_ACTUATOR.quantile(0.99) * 1e6:g} µs ({SENSOR_TO_ACTUATOR.count} amostras)")
+    if args.metrics_dump:
+        METRICS.dump(args.metrics_dump)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,144 @@
 import tkinter as tk
 from tkinter import ttk
-from tkinter import PhotoImage
-import threading
-import random
-import time
+import argparse
+
+from home_core import HomeState, AUTOMATIC
+from ui_queue import UpdateQueue, UI_QUEUE_DEPTH
+from floor_plan import FloorPlanRenderer, draw_static_layer, create_room_icons
+from layout import load_layout, MotionTracker, DEFAULT_LAYOUT
+from history import SensorHistory
+from event_log import open_event_log
+from runtime import HomeRuntime, TkAsyncBridge
+from clock import WallClock
+from rules import DEFAULT_RULES, load_rules
+from bus import COALESCE, BrokerLink, parse_address, parse_state_topic
+from metrics import METRICS, MetricsServer
+from energy import EnergyMeter, format_usage
+from icons import IconCache
+from snapshot import load_snapshot, save_snapshot, DEFAULT_SNAPSHOT
+
+# Número de pontos do gráfico de histórico da temperatura
+SPARKLINE_POINTS = 60
+# Janela do histórico mostrada no gráfico, em segundos: cada redesenho lê só ela
+SPARKLINE_WINDOW = 600.0
+
+# Período com que o log de eventos pendente é gravado em disco, mesmo sem novos eventos
+EVENT_LOG_FLUSH_PERIOD = 1.0
+
+# Período de atualização do painel de consumo
+ENERGY_PANEL_PERIOD = 5.0
+
+# Período do snapshot automático (recuperação após queda sem reproduzir o log inteiro)
+SNAPSHOT_PERIOD = 30.0
 
 class SmartHome:
-    def __init__(self, root):
+    def __init__(self, root, home=None, control="reactive", layout=None, event_log=None, seed=None,
+                 rules=DEFAULT_RULES, api_port=None, broker=None, metrics_port=None, metrics_dump=None,
+                 snapshot=None):
         self.root = root
         self.root.title("Simulação de Casa Inteligente com Planta Baixa")
 
+        # A interface sempre segue o relógio real
+        self.clock = WallClock()
+
+        # Planta baixa declarativa (layouts/casa.json por padrão)
+        self.layout = layout if layout is not None else load_layout()
+
+        # Estado da casa (núcleo sem Tkinter); as variáveis Tk abaixo são apenas a visão
+        if home is None:
+            home = HomeState(self.layout.make_rooms(), motion_panel_rooms=self.layout.motion_panel_rooms)
+        self.home = home
+
+        # Snapshot da última execução: restaura o estado em tempo proporcional aos cômodos
+        self.snapshot = snapshot
+        restored = load_snapshot(snapshot) if snapshot else None
+        if restored is not None:
+            restored.apply(self.home)
+
+        # Log binário de eventos: restaura o estado gravado (só o trecho posterior ao
+        # snapshot, se houver) e registra as novas mudanças
+        self.event_log = None
+        if event_log:
+            self.event_log = open_event_log(event_log, self.home, first=restored.log_records if restored else 0,
+                                            identity=restored.log_id if restored else None, clock=self.clock.now)
+
+        # Movimento no canvas resolvido pelo índice espacial da planta
+        self.motion_tracker = MotionTracker(self.home, self.layout)
+
+        # Histórico circular de temperatura e umidade
+        self.history = SensorHistory(self.home, clock=self.clock.now)
+
+        # Energia e tempo ligado de cada atuador, acumulados a cada transição
+        self.energy = EnergyMeter(self.home, self.clock)
+
         # Variáveis do sensor
         self.temperature = tk.DoubleVar(value=25.0)
         self.humidity = tk.DoubleVar(value=50.0)
         self.motion = tk.BooleanVar(value=False)
 
-        # Variáveis do atuador
-        self.light_on_sala_estar = tk.BooleanVar(value=False)
-        self.light_on_cozinha = tk.BooleanVar(value=False)
-        self.light_on_quarto = tk.BooleanVar(value=False)
-        self.light_on_banheiro = tk.BooleanVar(value=False)
-
-        self.ac_on_sala_estar = tk.BooleanVar(value=False)
-        self.ac_on_quarto = tk.BooleanVar(value=False)
+        # Variáveis do atuador, uma por cômodo da planta
+        self.light_vars = {key: tk.BooleanVar(value=False) for key in self.home.rooms}
+        self.ac_vars = {key: tk.BooleanVar(value=False) for key in self.home.ac_rooms}
 
         # Modo de operação
         self.mode = tk.StringVar(value="Manual")
 
-        # Carregar ícones (substitua pelos caminhos reais das imagens)
-        try:
-            self.temp_icon = PhotoImage(file="temperature1.png")
-            self.humidity_icon = PhotoImage(file="humidity1.png")
-            self.motion_icon = PhotoImage(file="motion1.png")
-            self.light_icon = PhotoImage(file="light1.png")
-            self.ac_icon = PhotoImage(file="ac1.png")
-        except tk.TclError:
-            print("Erro ao carregar imagens. Usando rótulos de texto em vez disso.")
-            self.temp_icon = None
-            self.humidity_icon = None
-            self.motion_icon = None
-            self.light_icon = None
-            self.ac_icon = None
+        self.sync_from_home()
+
+        # Ícones decodificados só quando um widget pede, com cache das versões já carregadas
+        self.icons = IconCache(self.root)
+
+        # Renderizador da planta baixa (criado em draw_floor_plan)
+        self.renderer = None
 
         self.create_widgets()
 
         # Variável de modo de rastreamento para atualizar o estado dos controles
         self.mode.trace_add("write", self.on_mode_change)
 
-        self.running = True
-
-        # Thread para atualizações de sensores (temperatura e umidade apenas)
-        self.sensor_thread = threading.Thread(target=self.update_sensors)
-        self.sensor_thread.daemon = True
-        self.sensor_thread.start()
-
-        # Thread para controle automático
-        self.control_thread = threading.Thread(target=self.automatic_control)
-        self.control_thread.daemon = True
-        self.control_thread.start()
+        # Mudanças no núcleo são refletidas na interface através de uma fila
+        # drenada uma vez por quadro
+        self.ui_queue = UpdateQueue(self.root, self.apply_home_changes)
+        UI_QUEUE_DEPTH.set_function(lambda: len(self.ui_queue))
+
+        # Sensores, controle e E/S rodam como corrotinas asyncio, processadas pelo
+        # próprio laço principal do Tk (nenhuma thread toca em objetos Tk)
+        self.bridge = TkAsyncBridge(self.root)
+        self.runtime = HomeRuntime(self.home, control=control, clock=self.clock, seed=seed, rules=rules)
+        self.runtime.add_house_sensors(on_update=self.update_sensors)
+        # A interface assina o estado no barramento com fila própria e coalescida por
+        # tópico: se ela atrasar, só o valor mais recente de cada tópico fica pendente
+        self.runtime.bus.subscribe("home/#", self.on_home_changes, policy=COALESCE, maxlen=4096)
+        self.runtime.every("energy", ENERGY_PANEL_PERIOD, self.update_energy)
+        if self.snapshot:
+            self.runtime.every("snapshot", SNAPSHOT_PERIOD, self.save_snapshot)
+        if self.event_log:
+            self.runtime.every("event_log", EVENT_LOG_FLUSH_PERIOD, self.event_log.flush)
+        self.runtime.start(self.bridge.loop)
+
+        # API local de controle, servida no mesmo event loop
+        self.api = None
+        if api_port is not None:
+            from api import ControlAPI
+            self.api = ControlAPI(self.home, port=api_port, energy=self.energy)
+            self.bridge.loop.run_until_complete(self.api.start())
+
+        # Dispositivos fora do processo, através do broker local
+        self.broker_link = None
+        if broker:
+            self.broker_link = BrokerLink(self.runtime.bus, *parse_address(broker))
+            self.bridge.loop.run_until_complete(self.broker_link.start())
+
+        # Métricas dos caminhos quentes, expostas no formato do Prometheus
+        self.metrics_dump = metrics_dump
+        self.metrics_server = None
+        if metrics_port is not None or metrics_dump:
+            METRICS.enable()
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(port=metrics_port)
+            self.bridge.loop.run_until_complete(self.metrics_server.start())
+
+        self.bridge.start()
 
     def create_widgets(self):
         # Quadro principal
@@ -78,18 +159,20 @@ class SmartHome:
 
         # Temperatura
         ttk.Label(sensor_frame, text="Temperatura:", font=('Segoe UI', 10, 'bold')).grid(row=0, column=0, sticky="w", padx=5, pady=6)
-        if self.temp_icon:
-            temp_label = ttk.Label(sensor_frame, image=self.temp_icon)
-            temp_label.image = self.temp_icon
+        temp_icon = self.icons.get("temperature")
+        if temp_icon:
+            temp_label = ttk.Label(sensor_frame, image=temp_icon)
+            temp_label.image = temp_icon
             temp_label.grid(row=0, column=2, sticky="e", padx=5, pady=6)
         ttk.Label(sensor_frame, textvariable=self.temperature, font=('Segoe UI', 10)).grid(row=0, column=1, sticky="e", padx=5, pady=6)
         ttk.Label(sensor_frame, text="°C", font=('Segoe UI', 10)).grid(row=0, column=3, sticky="w", padx=5, pady=6)
 
         # Umidade
         ttk.Label(sensor_frame, text="Umidade:", font=('Segoe UI', 10, 'bold')).grid(row=1, column=0, sticky="w", padx=5, pady=6)
-        if self.humidity_icon:
-            humidity_label = ttk.Label(sensor_frame, image=self.humidity_icon)
-            humidity_label.image = self.humidity_icon
+        humidity_icon = self.icons.get("humidity")
+        if humidity_icon:
+            humidity_label = ttk.Label(sensor_frame, image=humidity_icon)
+            humidity_label.image = humidity_icon
             humidity_label.grid(row=1, column=2, sticky="e", padx=5, pady=6)
         ttk.Label(sensor_frame, textvariable=self.humidity, font=('Segoe UI', 10)).grid(row=1, column=1, sticky="e", padx=5, pady=6)
         ttk.Label(sensor_frame, text="%", font=('Segoe UI', 10)).grid(row=1, column=3, sticky="w", padx=5, pady=6)
@@ -98,9 +181,10 @@ class SmartHome:
         self.motion_label = ttk.Label(sensor_frame, text="Movimento:", font=('Segoe UI', 10, 'bold'))
         self.motion_label.grid(row=2, column=0, sticky="w", padx=5, pady=6)
 
-        if self.motion_icon:
-            self.motion_icon_label = ttk.Label(sensor_frame, image=self.motion_icon)
-            self.motion_icon_label.image = self.motion_icon
+        motion_icon = self.icons.get("motion")
+        if motion_icon:
+            self.motion_icon_label = ttk.Label(sensor_frame, image=motion_icon)
+            self.motion_icon_label.image = motion_icon
             self.motion_icon_label.grid(row=2, column=2, sticky="e", padx=5, pady=6)
             self.motion_icon_label.bind("<Enter>", self.on_motion_hover_enter)
             self.motion_icon_label.bind("<Leave>", self.on_motion_hover_leave)
@@ -119,63 +203,27 @@ class SmartHome:
         actuator_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         actuator_frame.columnconfigure(1, weight=1)
 
-        # Luz da Sala de Estar
-        ttk.Label(actuator_frame, text="Luz da Sala de Estar:", font=('Segoe UI', 10, 'bold')).grid(row=0, column=0, sticky="w", padx=5, pady=8)
-        if self.light_icon:
-            light_label = ttk.Label(actuator_frame, image=self.light_icon)
-            light_label.image = self.light_icon
-            light_label.grid(row=0, column=2, sticky="e", padx=5, pady=8)
-        self.light_sala_estar_check = ttk.Checkbutton(actuator_frame, variable=self.light_on_sala_estar, command=self.update_icons_for_all_rooms)
-        self.light_sala_estar_check.grid(row=0, column=1, sticky="e", padx=5, pady=8)
-
-        # Luz da Cozinha
-        ttk.Label(actuator_frame, text="Luz da Cozinha:", font=('Segoe UI', 10, 'bold')).grid(row=1, column=0, sticky="w", padx=5, pady=8)
-        if self.light_icon:
-            light_label = ttk.Label(actuator_frame, image=self.light_icon)
-            light_label.image = self.light_icon
-            light_label.grid(row=1, column=2, sticky="e", padx=5, pady=8)
-        self.light_cozinha_check = ttk.Checkbutton(actuator_frame, variable=self.light_on_cozinha, command=self.update_icons_for_all_rooms)
-        self.light_cozinha_check.grid(row=1, column=1, sticky="e", padx=5, pady=8)
-
-        # Luz do Quarto
-        ttk.Label(actuator_frame, text="Luz do Quarto:", font=('Segoe UI', 10, 'bold')).grid(row=2, column=0, sticky="w", padx=5, pady=8)
-        if self.light_icon:
-            light_label = ttk.Label(actuator_frame, image=self.light_icon)
-            light_label.image = self.light_icon
-            light_label.grid(row=2, column=2, sticky="e", padx=5, pady=8)
-        self.light_quarto_check = ttk.Checkbutton(actuator_frame, variable=self.light_on_quarto, command=self.update_icons_for_all_rooms)
-        self.light_quarto_check.grid(row=2, column=1, sticky="e", padx=5, pady=8)
-
-        # Luz do Banheiro
-        ttk.Label(actuator_frame, text="Luz do Banheiro:", font=('Segoe UI', 10, 'bold')).grid(row=3, column=0, sticky="w", padx=5, pady=8)
-        if self.light_icon:
-            light_label = ttk.Label(actuator_frame, image=self.light_icon)
-            light_label.image = self.light_icon
-            light_label.grid(row=3, column=2, sticky="e", padx=5, pady=8)
-        self.light_banheiro_check = ttk.Checkbutton(actuator_frame, variable=self.light_on_banheiro, command=self.update_icons_for_all_rooms)
-        self.light_banheiro_check.grid(row=3, column=1, sticky="e", padx=5, pady=8)
-
-        # Ar Condicionado Sala de Estar
-        ttk.Label(actuator_frame, text="Ar Condicionado da Sala de Estar:", font=('Segoe UI', 10, 'bold')).grid(row=4, column=0, sticky="w", padx=5, pady=8)
-        if self.ac_icon:
-            ac_label = ttk.Label(actuator_frame, image=self.ac_icon)
-            ac_label.image = self.ac_icon
-            ac_label.grid(row=4, column=2, sticky="e", padx=5, pady=8)
-        self.ac_sala_estar_check = ttk.Checkbutton(actuator_frame, variable=self.ac_on_sala_estar, command=self.update_icons_for_all_rooms)
-        self.ac_sala_estar_check.grid(row=4, column=1, sticky="e", padx=5, pady=8)
-
-        # Ar Condicionado Quarto
-        ttk.Label(actuator_frame, text="Ar Condicionado do Quarto:", font=('Segoe UI', 10, 'bold')).grid(row=5, column=0, sticky="w", padx=5, pady=8)
-        if self.ac_icon:
-            ac_label = ttk.Label(actuator_frame, image=self.ac_icon)
-            ac_label.image = self.ac_icon
-            ac_label.grid(row=5, column=2, sticky="e", padx=5, pady=8)
-        self.ac_quarto_check = ttk.Checkbutton(actuator_frame, variable=self.ac_on_quarto, command=self.update_icons_for_all_rooms)
-        self.ac_quarto_check.grid(row=5, column=1, sticky="e", padx=5, pady=8)
+        # Uma linha por atuador, gerada a partir dos cômodos da planta
+        self.actuator_checks = []
+        light_icon = self.icons.get("light")
+        ac_icon = self.icons.get("ac")
+        rows = [("Luz", room, self.light_vars[room.key], light_icon, self.on_light_toggle)
+                for room in self.layout.rooms]
+        rows += [("Ar Condicionado", room, self.ac_vars[room.key], ac_icon, self.on_ac_toggle)
+                 for room in self.layout.rooms if room.key in self.ac_vars]
+        for row, (kind, room, var, icon, toggle) in enumerate(rows):
+            ttk.Label(actuator_frame, text=f"{kind} {room.preposition} {room.label}:", font=('Segoe UI', 10, 'bold')).grid(row=row, column=0, sticky="w", padx=5, pady=8)
+            if icon:
+                icon_label = ttk.Label(actuator_frame, image=icon)
+                icon_label.image = icon
+                icon_label.grid(row=row, column=2, sticky="e", padx=5, pady=8)
+            check = ttk.Checkbutton(actuator_frame, variable=var, command=lambda key=room.key, toggle=toggle: toggle(key))
+            check.grid(row=row, column=1, sticky="e", padx=5, pady=8)
+            self.actuator_checks.append(check)
 
         # Botão de redefinir atuadores
         self.reset_button = ttk.Button(actuator_frame, text="Redefinir Atuadores", command=self.reset_actuators)
-        self.reset_button.grid(row=6, column=0, columnspan=3, sticky="we", pady=(20, 0))
+        self.reset_button.grid(row=len(rows), column=0, columnspan=3, sticky="we", pady=(20, 0))
 
         # QUADRO DE MODO -----------------------------------
         mode_frame = ttk.LabelFrame(control_frame, text="Modo de Operação", padding=16)
@@ -185,13 +233,20 @@ class SmartHome:
         ttk.Radiobutton(mode_frame, text="Manual", variable=self.mode, value="Manual").grid(row=0, column=1, sticky="w", padx=10)
         ttk.Radiobutton(mode_frame, text="Automático", variable=self.mode, value="Automático").grid(row=0, column=2, sticky="w", padx=10)
 
+        # QUADRO DE CONSUMO -----------------------------------
+        energy_frame = ttk.LabelFrame(control_frame, text="Consumo", padding=16)
+        energy_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(20, 0))
+        self.energy_label = ttk.Label(energy_frame, text=format_usage(self.energy), font=('Segoe UI', 9))
+        self.energy_label.grid(row=0, column=0, sticky="w", padx=5)
+
         # Quadro direito: Desenho da planta da casa
         plan_frame = ttk.LabelFrame(main_frame, text="Layout da Casa", padding=16)
         plan_frame.grid(row=0, column=1, sticky=(tk.N, tk.E, tk.S), padx=(20, 0))
         plan_frame.rowconfigure(0, weight=1)
         plan_frame.columnconfigure(0, weight=1)
 
-        self.canvas = tk.Canvas(plan_frame, width=400, height=500, bg="#f0f0f0", highlightthickness=1, highlightbackground="#888")
+        width, height = self.layout.size
+        self.canvas = tk.Canvas(plan_frame, width=width, height=height, bg="#f0f0f0", highlightthickness=1, highlightbackground="#888")
         self.canvas.grid(row=0, column=0, sticky=(tk.N, tk.W, tk.E, tk.S))
         self.draw_floor_plan()
 
@@ -199,261 +254,213 @@ class SmartHome:
         self.on_mode_change()
 
     def draw_floor_plan(self):
+        # A camada estática é desenhada uma única vez; depois disso só os ícones dinâmicos
+        # são reconciliados pelo renderizador
+        if self.renderer is not None:
+            self.update_icons_for_all_rooms()
+            return
+
         c = self.canvas
         c.delete("all")
+        self.renderer = FloorPlanRenderer(c)
 
-        wall_color = "#666"
-
-        # Desenhar cômodos e associar tags para monitorar enter/leave do mouse
-        # Sala de Estar
-        c.create_rectangle(30, 30, 200, 250, fill="#d1e7dd", outline=wall_color, width=2, tags=("room", "livingroom"))
-        c.create_text(115, 140, text="Sala de Estar", font=("Segoe UI", 14, "bold"), fill="#0f5132")
-
-        # Cozinha
-        c.create_rectangle(210, 30, 370, 150, fill="#fff3cd", outline=wall_color, width=2, tags=("room", "kitchen"))
-        c.create_text(290, 90, text="Cozinha", font=("Segoe UI", 14, "bold"), fill="#664d03")
-
-        # Quarto
-        c.create_rectangle(210, 160, 370, 320, fill="#cfe2ff", outline=wall_color, width=2, tags=("room", "bedroom"))
-        c.create_text(290, 240, text="Quarto", font=("Segoe UI", 14, "bold"), fill="#084298")
-
-        # Banheiro
-        c.create_rectangle(30, 260, 200, 480, fill="#f8d7da", outline=wall_color, width=2, tags=("room", "bathroom"))
-        c.create_text(115, 370, text="Banheiro", font=("Segoe UI", 14, "bold"), fill="#842029")
-
-        # Desenhar portas e janelas
-        c.create_line(115, 250, 115, 260, fill=wall_color, width=4)
-        c.create_rectangle(70, 25, 140, 18, fill="#0d6efd", outline="#0d6efd")
-        c.create_rectangle(250, 25, 320, 18, fill="#0d6efd", outline="#0d6efd")
-        c.create_rectangle(350, 180, 357, 230, fill="#0d6efd", outline="#0d6efd")
-
-        # Móveis
-        c.create_rectangle(40, 80, 170, 130, fill="#6c757d", outline="#495057", width=2)
-        c.create_text(105, 105, text="Sofá", fill="white", font=("Segoe UI", 10, "bold"))
-        c.create_oval(80, 160, 150, 210, fill="#adb5bd", outline="#6c757d")
-        c.create_rectangle(230, 50, 290, 120, fill="#343a40", outline="#212529", width=2)
-        c.create_text(260, 85, text="Fogão", fill="white", font=("Segoe UI", 10, "bold"))
-        c.create_rectangle(230, 180, 350, 300, fill="#0d6efd", outline="#084298", width=3)
-        c.create_text(290, 240, text="Cama", fill="white", font=("Segoe UI", 12, "bold"))
-        c.create_oval(50, 300, 120, 370, fill="#6f42c1", outline="#4b229b", width=2)
-        c.create_text(85, 335, text="Pia", fill="white", font=("Segoe UI", 10, "bold"))
+        layout = self.layout
+        draw_static_layer(c, layout)
 
         # Ícones sensores fixos de temperatura e umidade
-        if self.temp_icon:
-            self.canvas.create_image(280, 140, image=self.temp_icon)
-        if self.humidity_icon:
-            self.canvas.create_image(90, 400, image=self.humidity_icon)
-
-        # Associa eventos de mouse enter e leave para cada cômodo para detectar movimento
-        for room_tag in ("livingroom", "kitchen", "bedroom", "bathroom"):
-            c.tag_bind(room_tag, "<Enter>", self.on_motion_hover_enter_canvas)
-            c.tag_bind(room_tag, "<Leave>", self.on_motion_hover_leave_canvas)
-
-        # Dicionários para armazenar IDs dos ícones de luz e AC em cada cômodo
-        self.room_light_icons = {}
-        self.room_ac_icons = {}
-
-        # Coordenadas para os pequenos ícones de luz e AC dentro de cada cômodo (aproximadas)
-        coords = {
-            "livingroom": (80, 60),
-            "kitchen": (270, 60),
-            "bedroom": (290, 200),
-            "bathroom": (100, 300),
-        }
+        for name in ("temperature", "humidity"):
+            icon = self.icons.get(name) if name in layout.sensor_icons else None
+            if icon:
+                self.canvas.create_image(*layout.sensor_icons[name], image=icon)
+
+        # Gráfico com o histórico recente da temperatura
+        self.sparkline_line = None
+        if layout.sparkline:
+            x1, y1, x2, y2 = layout.sparkline
+            c.create_rectangle(x1, y1, x2, y2, fill="white", outline="#adb5bd")
+            c.create_text(x1 + 4, y1 - 8, text="Temperatura", anchor="w", font=("Segoe UI", 8), fill="#495057")
+            self.sparkline_line = c.create_line(x1, y2, x2, y2, fill="#dc3545", width=2)
+            self.draw_sparkline()
+
+        # Movimento do mouse no canvas é resolvido para um cômodo pelo índice espacial
+        c.bind("<Motion>", self.on_motion_hover_enter_canvas)
+        c.bind("<Leave>", self.on_motion_hover_leave_canvas)
 
         # Desenhar ícones pequenos para luz e ar condicionado em cada cômodo
-        for room, (x, y) in coords.items():
-            # Luz: círculo amarelo/claro para ligado, cinza para desligado
-            light_color = "#6c757d"  # cor inicial desligada
-            ac_color = "#6c757d"  # cor inicial desligada
-            if room == "livingroom":
-                light_color = "#ffc107" if self.light_on_sala_estar.get() else "#6c757d"
-                ac_color = "#0dcaf0" if self.ac_on_sala_estar.get() else "#6c757d"
-                light_id = c.create_oval(x-10, y-10, x+10, y+10, fill=light_color, outline="")
-                ac_id = c.create_rectangle(x-10, y+15, x+10, y+35, fill=ac_color, outline="")
-                self.room_light_icons[room] = light_id
-                self.room_ac_icons[room] = ac_id
-            elif room == "kitchen":
-                light_color = "#ffc107" if self.light_on_cozinha.get() else "#6c757d"
-                light_id = c.create_oval(x-10, y-10, x+10, y+10, fill=light_color, outline="")
-                self.room_light_icons[room] = light_id
-                # Sem ícone de AC para cozinha
-            elif room == "bedroom":
-                light_color = "#ffc107" if self.light_on_quarto.get() else "#6c757d"
-                ac_color = "#0dcaf0" if self.ac_on_quarto.get() else "#6c757d"
-                light_id = c.create_oval(x-10, y-10, x+10, y+10, fill=light_color, outline="")
-                ac_id = c.create_rectangle(x-10, y+15, x+10, y+35, fill=ac_color, outline="")
-                self.room_light_icons[room] = light_id
-                self.room_ac_icons[room] = ac_id
-            elif room == "bathroom":
-                light_color = "#ffc107" if self.light_on_banheiro.get() else "#6c757d"
-                light_id = c.create_oval(x-10, y-10, x+10, y+10, fill=light_color, outline="")
-                self.room_light_icons[room] = light_id
-                # Sem ícone de AC para banheiro
-
-        # Atualizar ícones para refletir corretamente os estados atuais
-        self.update_icons_for_all_rooms()
-
-    # Eventos de hover do mouse nos cômodos para sensor de movimento
-    def on_motion_hover_enter_canvas(self, event=None):
-        tags = self.canvas.gettags("current")
-        if not tags:
-            return
-        if self.mode.get() != "Automático":
-            return  # só responde no modo automático
-        if "livingroom" in tags:
-            self.light_on_sala_estar.set(True)
-            if self.temperature.get() > 28:
-                self.ac_on_sala_estar.set(True)
-        elif "kitchen" in tags:
-            self.light_on_cozinha.set(True)
-        elif "bedroom" in tags:
-            self.light_on_quarto.set(True)
-            if self.temperature.get() > 28:
-                self.ac_on_quarto.set(True)
-        elif "bathroom" in tags:
-            self.light_on_banheiro.set(True)
-        self.motion.set(True)
-        self.update_icons_for_all_rooms()
+        # Luz: círculo amarelo/claro para ligado, cinza para desligado
+        create_room_icons(self.renderer, layout, self.home)
 
-    def on_motion_hover_leave_canvas(self, event=None):
-        tags = self.canvas.gettags("current")
-        if not tags:
+    # Redesenha o gráfico de temperatura com uma série reduzida do histórico (um único coords)
+    def draw_sparkline(self):
+        if self.sparkline_line is None:
             return
-        if self.mode.get() != "Automático":
+        x1, y1, x2, y2 = self.layout.sparkline
+        since = self.clock.now() - SPARKLINE_WINDOW
+        points = self.history.buffer(None, "temperature").downsample(SPARKLINE_POINTS, since=since)
+        if len(points) < 2:
             return
-        if "livingroom" in tags:
-            self.light_on_sala_estar.set(False)
-            self.ac_on_sala_estar.set(False)
-        elif "kitchen" in tags:
-            self.light_on_cozinha.set(False)
-        elif "bedroom" in tags:
-            self.light_on_quarto.set(False)
-            self.ac_on_quarto.set(False)
-        elif "bathroom" in tags:
-            self.light_on_banheiro.set(False)
-        self.motion.set(False)
-        self.update_icons_for_all_rooms()
+        lo, hi = min(points), max(points)
+        span = (hi - lo) or 1.0
+        step = (x2 - x1) / (len(points) - 1)
+        coords = []
+        for i, value in enumerate(points):
+            coords.append(x1 + i * step)
+            coords.append(y2 - 2 - (value - lo) / span * (y2 - y1 - 4))
+        self.canvas.coords(self.sparkline_line, *coords)
+
+    # Eventos de movimento do mouse nos cômodos para sensor de movimento
+    def on_motion_hover_enter_canvas(self, event=None):
+        self.motion_tracker.move_to(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+
+    def on_motion_hover_leave_canvas(self, event=None):
+        self.motion_tracker.leave()
 
     # Atualizar os pequenos ícones de luz e AC em todos os cômodos
     def update_icons_for_all_rooms(self):
-        c = self.canvas
-        light_color_on = "#ffc107"
-        light_color_off = "#6c757d"
-        ac_color_on = "#0dcaf0"
-        ac_color_off = "#6c757d"
-
-        # Atualizar Sala de Estar
-        light_id = self.room_light_icons.get("livingroom")
-        ac_id = self.room_ac_icons.get("livingroom")
-        if light_id:
-            new_light_color = light_color_on if self.light_on_sala_estar.get() else light_color_off
-            c.itemconfig(light_id, fill=new_light_color)
-        if ac_id:
-            new_ac_color = ac_color_on if self.ac_on_sala_estar.get() else ac_color_off
-            c.itemconfig(ac_id, fill=new_ac_color)
-
-        # Atualizar Cozinha
-        light_id = self.room_light_icons.get("kitchen")
-        if light_id:
-            new_light_color = light_color_on if self.light_on_cozinha.get() else light_color_off
-            c.itemconfig(light_id, fill=new_light_color)
-
-        # Atualizar Quarto
-        light_id = self.room_light_icons.get("bedroom")
-        ac_id = self.room_ac_icons.get("bedroom")
-        if light_id:
-            new_light_color = light_color_on if self.light_on_quarto.get() else light_color_off
-            c.itemconfig(light_id, fill=new_light_color)
-        if ac_id:
-            new_ac_color = ac_color_on if self.ac_on_quarto.get() else ac_color_off
-            c.itemconfig(ac_id, fill=new_ac_color)
-
-        # Atualizar Banheiro
-        light_id = self.room_light_icons.get("bathroom")
-        if light_id:
-            new_light_color = light_color_on if self.light_on_banheiro.get() else light_color_off
-            c.itemconfig(light_id, fill=new_light_color)
+        for room_key in self.home.rooms:
+            self.update_room_icons(room_key)
+
+    # O renderizador só chama itemconfig se a cor do ícone mudou
+    def update_room_icons(self, room_key):
+        self.renderer.update_room(self.home.rooms[room_key])
 
     # Evento de hover do mouse no ícone/rótulo de movimento no quadro de controles - também atualiza o estado de movimento + luz
     def on_motion_hover_enter(self, event=None):
-        self.motion.set(True)
-        if self.mode.get() == "Automático":
-            self.light_on_sala_estar.set(True)
-            self.light_on_quarto.set(True)
-            self.update_icons_for_all_rooms()
+        self.home.motion_detected()
 
     def on_motion_hover_leave(self, event=None):
-        self.motion.set(False)
-        if self.mode.get() == "Automático":
-            self.light_on_sala_estar.set(False)
-            self.light_on_quarto.set(False)
-            self.update_icons_for_all_rooms()
+        self.home.motion_cleared()
+
+    # Checkbuttons do quadro de atuadores escrevem diretamente no núcleo
+    def on_light_toggle(self, room_key):
+        self.home.command(room_key, "light", self.light_vars[room_key].get())
+
+    def on_ac_toggle(self, room_key):
+        self.home.command(room_key, "ac", self.ac_vars[room_key].get())
 
     # Redefinir todos os atuadores para desligado (apenas no modo Manual)
     def reset_actuators(self):
-        if self.mode.get() == "Manual":
-            self.light_on_sala_estar.set(False)
-            self.light_on_cozinha.set(False)
-            self.light_on_quarto.set(False)
-            self.light_on_banheiro.set(False)
-            self.ac_on_sala_estar.set(False)
-            self.ac_on_quarto.set(False)
-            self.update_icons_for_all_rooms()
+        self.home.reset_actuators()
 
     # Atualizar estados dos widgets com base no modo (desabilitar controles manuais no automático)
     def on_mode_change(self, *args):
         mode = self.mode.get()
-        widgets = [
-            self.light_sala_estar_check,
-            self.light_cozinha_check,
-            self.light_quarto_check,
-            self.light_banheiro_check,
-            self.ac_sala_estar_check,
-            self.ac_quarto_check,
-            self.reset_button
-        ]
-        if mode == "Automático":
+        self.home.set_mode(mode)
+        widgets = self.actuator_checks + [self.reset_button]
+        if mode == AUTOMATIC:
             for w in widgets:
                 w.state(['disabled'])
         else:
             for w in widgets:
                 w.state(['!disabled'])
-            self.reset_actuators()
 
+    # Copiar todo o estado do núcleo para as variáveis Tk
+    def sync_from_home(self):
+        home = self.home
+        self.temperature.set(home.temperature)
+        self.humidity.set(home.humidity)
+        self.motion.set(home.motion)
+        self.mode.set(home.mode)
+        for room_key, var in self.light_vars.items():
+            var.set(home.rooms[room_key].light_on)
+        for room_key, var in self.ac_vars.items():
+            var.set(home.rooms[room_key].ac_on)
+
+    # Lote de mudanças de estado vindo do barramento
+    def on_home_changes(self, items):
+        for topic, value in items:
+            key = parse_state_topic(topic)
+            if key is not None:
+                self.ui_queue.push(key, value)
+
+    # Aplica um lote de mudanças uma vez por quadro; só os ícones dos cômodos alterados são revisitados
+    def apply_home_changes(self, changes):
+        dirty_rooms = set()
+        for (room_key, field), value in changes.items():
+            if field == "light":
+                self.light_vars[room_key].set(value)
+                dirty_rooms.add(room_key)
+            elif field == "ac":
+                self.ac_vars[room_key].set(value)
+                dirty_rooms.add(room_key)
+            elif field == "temperature":
+                self.temperature.set(value)
+                self.draw_sparkline()
+            elif field == "humidity":
+                self.humidity.set(value)
+            elif field == "motion" and room_key is None:
+                self.motion.set(value)
+            elif field == "mode" and self.mode.get() != value:
+                self.mode.set(value)
+            elif field == "last_updated":
+                self.last_updated_label.config(text=f"Última atualização: {value}")
+            elif field == "energy":
+                self.energy_label.config(text=value)
+        for room_key in dirty_rooms:
+            self.update_room_icons(room_key)
+
+    # Chamado pelo runtime depois de cada leitura dos sensores
     def update_sensors(self):
-        while self.running:
-            new_temp = round(random.uniform(18, 35), 1)
-            new_humidity = round(random.uniform(30, 70), 1)
-            self.root.after(0, self.temperature.set, new_temp)
-            self.root.after(0, self.humidity.set, new_humidity)
-            update_time_str = time.strftime("%Y-%m-%d %H:%M:%S")
-            self.root.after(0, self.last_updated_label.config, {'text': f"Última atualização: {update_time_str}"})
-            time.sleep(2)
-
-    def automatic_control(self):
-        while self.running:
-            if self.mode.get() == "Automático":
-                # Controlar AC na Sala de Estar e Quarto baseado na temperatura e movimento
-                if self.temperature.get() > 28:
-                    self.ac_on_sala_estar.set(True)
-                    # Ativa AC do quarto somente se a luz do quarto estiver ligada (presença)
-                    self.ac_on_quarto.set(self.light_on_quarto.get())
-                else:
-                    self.ac_on_sala_estar.set(False)
-                    self.ac_on_quarto.set(False)
-
-                self.root.after(0, self.update_icons_for_all_rooms)
-            time.sleep(0.5)
+        update_time_str = self.clock.strftime("%Y-%m-%d %H:%M:%S")
+        self.ui_queue.push((None, "last_updated"), update_time_str)
+
+    # Resumo do consumo (potência atual, última hora, últimas 24 h) para o painel
+    def update_energy(self):
+        self.ui_queue.push((None, "energy"), format_usage(self.energy))
+
+    # Grava o estado atual; com log de eventos, junto com a identidade do log e quantos
+    # registros ele já cobre
+    def save_snapshot(self):
+        log_records = 0
+        log_id = 0
+        if self.event_log:
+            self.event_log.flush()
+            log_records = self.event_log.records
+            log_id = self.event_log.identity
+        save_snapshot(self.snapshot, self.home, log_records, log_id, clock=self.clock.now)
 
     def stop(self):
-        self.running = False
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.broker_link:
+            self.broker_link.stop()
+        if self.api:
+            self.api.stop()
+        self.runtime.stop()
+        self.bridge.stop()
+        if self.snapshot:
+            self.save_snapshot()
+        if self.event_log:
+            self.event_log.close()
+        if self.metrics_dump:
+            METRICS.dump(self.metrics_dump)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulação de Casa Inteligente")
+    parser.add_argument("--control", choices=("reactive", "polling"), default="reactive",
+                        help="controle automático reativo (padrão) ou por polling a cada 0,5 s")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="arquivo JSON com a planta baixa")
+    parser.add_argument("--event-log", help="log binário de eventos (restaurado na partida, se existir)")
+    parser.add_argument("--seed", type=int, help="semente do gerador aleatório dos sensores")
+    parser.add_argument("--rules", help="arquivo JSON com as regras do modo automático")
+    parser.add_argument("--api-port", type=int, help="serve a API local de controle (JSON/HTTP) nesta porta")
+    parser.add_argument("--broker", metavar="HOST:PORTA",
+                        help="liga o barramento a um broker local (python bus.py broker) para dispositivos externos")
+    parser.add_argument("--metrics-port", type=int, help="liga as métricas e as serve (Prometheus) nesta porta")
+    parser.add_argument("--metrics-dump", metavar="ARQUIVO",
+                        help="liga as métricas e as grava neste arquivo ao encerrar (- para a saída de erro)")
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT,
+                        help="snapshot do estado, restaurado na partida e gravado ao encerrar e a cada 30 s")
+    parser.add_argument("--no-snapshot", action="store_true", help="começa dos valores padrão e não grava snapshot")
+    args = parser.parse_args()
+
     root = tk.Tk()
     ttk.Style().theme_use('clam')
-    app = SmartHome(root)
+    app = SmartHome(root, control=args.control, layout=load_layout(args.layout), event_log=args.event_log, seed=args.seed,
+                   rules=load_rules(args.rules) if args.rules else DEFAULT_RULES, api_port=args.api_port,
+                   broker=args.broker, metrics_port=args.metrics_port, metrics_dump=args.metrics_dump,
+                   snapshot=None if args.no_snapshot else args.snapshot)
     try:
         root.mainloop()
     finally:
-        app.stop()
\ No newline at end of file
+        app.stop()
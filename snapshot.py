@@ -0,0 +1,123 @@
+# Snapshot compacto do estado da casa (modo, sensores, atuadores e presença por
+# cômodo), gravado ao encerrar e periodicamente, e restaurado na partida em tempo
+# proporcional ao número de cômodos, sem reproduzir o log de eventos inteiro.
+#
+# Formato (little-endian): cabeçalho fixo, um registro por cômodo (tamanho da chave em
+# u16, chave UTF-8, bits luz/AC/presença) e um CRC32 de tudo o que vem antes.
+# Com log de eventos, o snapshot guarda a identidade do log e quantos registros dele já
+# cobre, e só o restante do log é reproduzido; com outro log, ele é reproduzido inteiro.
+import os
+import struct
+import time
+import zlib
+
+from home_core import MANUAL, AUTOMATIC
+
+MAGIC = b"CASASNP3"
+# magic, instante, modo, temperatura, umidade, movimento, identidade do log, registros
+# do log, cômodos
+HEADER = struct.Struct("<8sdBddBIQI")
+KEY_LENGTH = struct.Struct("<H")
+CRC = struct.Struct("<I")
+MODES = (MANUAL, AUTOMATIC)
+
+LIGHT = 1
+AC = 2
+MOTION = 4
+
+DEFAULT_SNAPSHOT = "casa.snap"
+
+
+class Snapshot:
+    __slots__ = ("saved_at", "mode", "temperature", "humidity", "motion", "log_id", "log_records", "rooms")
+
+    def __init__(self, saved_at, mode, temperature, humidity, motion, log_id, log_records, rooms):
+        self.saved_at = saved_at
+        self.mode = mode
+        self.temperature = temperature
+        self.humidity = humidity
+        self.motion = motion
+        # EventLog.identity do log coberto (0 sem log)
+        self.log_id = log_id
+        self.log_records = log_records
+        # room_key -> (luz, AC, presença)
+        self.rooms = rooms
+
+    @classmethod
+    def of(cls, home, log_records=0, log_id=0, clock=time.time):
+        rooms = {room.key: (room.light_on, room.ac_on, room.motion) for room in home.rooms.values()}
+        return cls(clock(), home.mode, home.temperature, home.humidity, home.motion, log_id, log_records, rooms)
+
+    def pack(self):
+        if self.mode not in MODES:
+            raise ValueError(f"modo desconhecido: {self.mode!r}")
+        parts = [HEADER.pack(MAGIC, self.saved_at, MODES.index(self.mode), self.temperature, self.humidity,
+                             self.motion, self.log_id, self.log_records, len(self.rooms))]
+        for key, (light, ac, motion) in self.rooms.items():
+            encoded = key.encode("utf-8")
+            if len(encoded) > 0xFFFF:
+                raise ValueError(f"chave de cômodo longa demais para o snapshot: {key[:40]!r}...")
+            parts.append(KEY_LENGTH.pack(len(encoded)) + encoded
+                         + bytes((LIGHT * light | AC * ac | MOTION * motion,)))
+        data = b"".join(parts)
+        return data + CRC.pack(zlib.crc32(data))
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) < HEADER.size + CRC.size:
+            raise ValueError("snapshot truncado")
+        body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+        if zlib.crc32(body) != crc:
+            raise ValueError("snapshot corrompido")
+        (magic, saved_at, mode, temperature, humidity, motion, log_id, log_records,
+         n_rooms) = HEADER.unpack_from(body)
+        if magic != MAGIC:
+            raise ValueError("arquivo não é um snapshot da casa")
+        rooms = {}
+        offset = HEADER.size
+        for _ in range(n_rooms):
+            (length,) = KEY_LENGTH.unpack_from(body, offset)
+            offset += KEY_LENGTH.size
+            key = body[offset:offset + length].decode("utf-8")
+            flags = body[offset + length]
+            rooms[key] = (bool(flags & LIGHT), bool(flags & AC), bool(flags & MOTION))
+            offset += length + 1
+        return cls(saved_at, MODES[mode], temperature, humidity, bool(motion), log_id, log_records, rooms)
+
+    # Aplica no núcleo pelos setters (os listeners são notificados normalmente). O modo
+    # vem primeiro, porque entrar no Manual desliga os atuadores; cômodos que não
+    # existem mais na planta são ignorados.
+    def apply(self, home):
+        home.set_mode(self.mode)
+        for key, (light, ac, motion) in self.rooms.items():
+            if key not in home.rooms:
+                continue
+            home.set_light(key, light)
+            home.set_ac(key, ac)
+            home.set_room_motion(key, motion)
+        home.set_temperature(self.temperature)
+        home.set_humidity(self.humidity)
+        home.set_motion(self.motion)
+
+
+# Grava de forma atômica: arquivo temporário + fsync + rename
+def save_snapshot(path, home, log_records=0, log_id=0, clock=time.time):
+    data = Snapshot.of(home, log_records, log_id, clock).pack()
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+    return len(data)
+
+
+# Snapshot gravado em `path`, ou None se não existir ou estiver inválido
+def load_snapshot(path):
+    try:
+        with open(path, "rb") as f:
+            return Snapshot.unpack(f.read())
+    except (OSError, ValueError, struct.error, IndexError, UnicodeDecodeError):
+        return None
@@ -0,0 +1,68 @@
+# Fila de atualizações da interface, segura entre threads.
+# As threads de trabalho empurram deltas de estado (chave -> valor); o laço principal
+# do Tk drena tudo em um único callback por quadro. Escritas repetidas para a mesma
+# chave são coalescidas e valores iguais ao último aplicado são descartados.
+import threading
+from time import perf_counter
+
+from metrics import METRICS, SIZE_BUCKETS
+
+# Intervalo de um quadro da interface (~60 Hz)
+FRAME_MS = 16
+
+UI_BATCH_SIZE = METRICS.histogram("ui_batch_size", "Mudanças aplicadas por quadro da interface", SIZE_BUCKETS)
+UI_DRAIN_SECONDS = METRICS.histogram("ui_drain_seconds", "Tempo para aplicar um quadro de mudanças na interface")
+UI_QUEUE_DEPTH = METRICS.gauge("ui_queue_depth", "Mudanças pendentes na fila da interface")
+
+
+class UpdateQueue:
+    __slots__ = ("root", "apply_batch", "frame_ms", "_lock", "_pending", "_scheduled", "_applied")
+
+    def __init__(self, root, apply_batch, frame_ms=FRAME_MS):
+        self.root = root
+        # apply_batch(changes) recebe um dict {chave: valor} somente com o que mudou
+        self.apply_batch = apply_batch
+        self.frame_ms = frame_ms
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._scheduled = False
+        self._applied = {}
+
+    def push(self, key, value):
+        with self._lock:
+            self._pending[key] = value
+            if self._scheduled:
+                return
+            self._scheduled = True
+        # Apenas um root.after por quadro, não importa quantos deltas cheguem
+        self.root.after(self.frame_ms, self._drain)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    # Executado na thread principal do Tk
+    def _drain(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._scheduled = False
+
+        applied = self._applied
+        changes = {}
+        for key, value in pending.items():
+            if applied.get(key, _MISSING) != value:
+                applied[key] = value
+                changes[key] = value
+        if not changes:
+            return
+        if METRICS.enabled:
+            start = perf_counter()
+            self.apply_batch(changes)
+            UI_DRAIN_SECONDS.observe(perf_counter() - start)
+            UI_BATCH_SIZE.observe(len(changes))
+        else:
+            self.apply_batch(changes)
+
+
+_MISSING = object()